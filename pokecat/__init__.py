@@ -1,20 +1,24 @@
 
 import logging
-import random
 import re
-from collections import Counter
+from collections import Counter, namedtuple
 from copy import deepcopy
 from difflib import ndiff
-from itertools import chain
-from warnings import warn
+from functools import lru_cache
+from itertools import chain, product
+from time import perf_counter
 from unidecode import unidecode
 
 from Levenshtein import ratio
 
 from .utils import normalize_name
 from . import gen1data, gen4data, forms, stats
-from . import utils, objects
+from .generations import Generation, get_generation
+from . import utils, objects, profiling, autocomplete, metrics
+from .rng import get_rng, derive_rng
 from .suppress import Suppressions
+from .diagnostics import Diagnostic, Diagnostics, DiagnosticCode, warn_diagnostic
+from .redaction import RedactedView, redacted_view, dumps_redacted, REDACTED_JSON_FRAGMENT
 
 log = logging.getLogger(__name__)
 
@@ -23,6 +27,34 @@ _OPTIONAL_FIELDS = {"ability": None, "ingamename": None, "gender": None, "form":
                     "happiness": 255, "shiny": False, "biddable": None, "hidden": None, "rarity": 1.0, "ball": "Poké",
                     "level": 100, "curr_hp": None, "status": None, "combinations": [], "separations": [], "tags": [], "suppressions": []}
 _GLOBAL_SUPPRESSIONS = {Suppressions.WASTED_EVS}
+# warn if less than this fraction of a set's possible instances respect its restrictions
+_FEASIBILITY_WARN_FRACTION = 0.01
+
+# fields of a populated set which need other fields to be populated first.
+# species, item and the fields checked alongside the species are always populated
+_FIELD_DEPENDENCIES = {
+    "stats": {"evs", "ivs", "nature"},
+    "curr_hp": {"stats"},
+    "tags": {"ability"},
+    # checking them needs all options to know what is referenced and feasible
+    "combinations": {"moves", "ability", "ball", "gender", "separations"},
+    "separations": {"moves", "ability", "ball", "gender", "combinations"},
+}
+POPULATED_FIELDS = frozenset(_OBLIGATORY_FIELDS | set(_OPTIONAL_FIELDS) | {"stats"}) - {"suppressions"}
+
+
+def _required_fields(fields):
+    unknown = set(fields) - POPULATED_FIELDS
+    if unknown:
+        raise ValueError("Unknown fields to populate: %s" % ", ".join(sorted(unknown)))
+    required = set()
+    pending = list(fields)
+    while pending:
+        field = pending.pop()
+        if field not in required:
+            required.add(field)
+            pending.extend(_FIELD_DEPENDENCIES.get(field, ()))
+    return required
 
 def is_difference_significant(name1, name2):
     name1, name2 = unidecode(name1.lower()), unidecode(name2.lower())
@@ -35,7 +67,7 @@ def is_difference_significant(name1, name2):
 
 
 # just code recycling for populate_pokeset()
-def _get_by_index_or_name(lst, index_or_name, name_of_thing, get_func, find_func):
+def _get_by_index_or_name(lst, index_or_name, name_of_thing, get_func, find_func, copy=True):
     if isinstance(index_or_name, int):
         try:
             thing = lst[index_or_name]
@@ -51,14 +83,62 @@ def _get_by_index_or_name(lst, index_or_name, name_of_thing, get_func, find_func
                 raise ValueError("Unrecognized %s: %s, autocorrection was ambiguous: %s"
                                  % (name_of_thing, index_or_name, ", ".join(n["name"] for n in candidates.values())))
             thing = next(iter(candidates.values()))
+            metrics.lookups.labels(name_of_thing, "autocorrected").inc()
             # special case: "ball" is not appended for balls
             if name_of_thing == "ball":
                 index_or_name += " ball"
-            return deepcopy(thing), not is_difference_significant(index_or_name, thing["name"])
-    return deepcopy(thing), True
+            thing_copy = deepcopy(thing) if copy else thing
+            return thing_copy, not is_difference_significant(index_or_name, thing["name"])
+        metrics.lookups.labels(name_of_thing, "exact").inc()
+    return (deepcopy(thing) if copy else thing), True
+
+
+def _new_status():
+    return {
+        "nonvolatile": {
+            "slp": 0,
+            "psn": False,
+            "brn": False,
+            "frz": False,
+            "par": False,
+            "tox": 0,
+        },
+        "volatile": {
+            "cnf": 0,
+            "cur": False,  # curse
+            "inf": False,  # infatuation
+            "foc": False,  # focus energy
+            "tau": False,  # taunt
+            "tor": False,  # torment
+        }
+    }
+
+
+def _add_generated_tags(pokeset):
+    if pokeset["biddable"]:
+        pokeset["tags"].append("biddable")
+    if pokeset["hidden"]:
+        pokeset["tags"].append("hidden")
+    if pokeset["shiny"]:
+        pokeset["tags"].append("shiny")
+    pokeset["tags"].append("species+%d" % pokeset["species"]["id"])
+    pokeset["tags"].append("species+%s" % pokeset["species"]["name"])
+    for type_ in pokeset["species"]["types"]:
+        pokeset["tags"].append("type+%s" % type_)
+    pokeset["tags"].append("color+%s" % pokeset["species"]["color"])
+    pokeset["tags"].append("level+%d" % pokeset["level"])
+    pokeset["tags"].append("form+%d" % pokeset["form"])
+
+    for ability_ in pokeset["ability"]:
+        if ability_:
+            pokeset["tags"].append("ability+%s" % str(ability_["name"]))
+    pokeset["tags"].append("setname+%s" % pokeset["setname"])
+
+    # ensure no duplicate tags
+    pokeset["tags"] = sorted(set(pokeset["tags"]))
 
 
-def populate_pokeset(pokeset, skip_ev_check=False):
+def populate_pokeset(pokeset, skip_ev_check=False, diagnostics=None, generation=None, fields=None):
     """
     Reads in data for one pokeset and populates it with all additionally available
     data. This includes types of Pokémon or per-move data like PP, power or types.
@@ -67,26 +147,71 @@ def populate_pokeset(pokeset, skip_ev_check=False):
         pokeset: base data of the set to populate. see the format specification for details.
         skip_ev_check: Defaults to False. If True, allows illegal movesets (produces a
                        warning instead of an error)
+        diagnostics: Defaults to None, which emits warnings for correctable problems.
+                     If a Diagnostics object is supplied, they get collected into it
+                     instead, which unlike catching warnings is thread-safe.
+        generation: Defaults to None, which is generation 4. The generation number or
+                    Generation object whose data the set gets populated with.
+        fields: Defaults to None, which populates everything. If a list of field names
+                is supplied, only those fields and the ones they depend on get populated
+                and checked, and only the supplied fields are returned, e.g.
+                ["species", "tags", "rarity", "biddable"] for building indexes.
+                The species and the simple flags are always checked.
     Throws:
         ValueError: If the data is not fully parsable. the ValueError's description contains
         further details on the error that occured.
     Returns:
         The populated set. The passed data is not modified
     """
+    start = perf_counter()
+    required = None if fields is None else _required_fields(fields)
+    try:
+        populated = _populate(pokeset, skip_ev_check, diagnostics, generation, build=True, required=required)
+    finally:
+        metrics.populate_seconds.observe(perf_counter() - start)
+    if fields is not None:
+        return {field: populated[field] for field in fields}
+    return populated
+
+
+def validate_pokeset(pokeset, skip_ev_check=False, diagnostics=None, generation=None):
+    """
+    Runs the same checks as `populate_pokeset`, raising the same errors and
+    reporting the same correctable problems, but without building the populated set.
+    No data gets copied and stats, status and tags aren't computed, which makes
+    this a lot faster if only the validity of a set is of interest.
+    Arguments are the same as for `populate_pokeset`.
+
+    Throws:
+        ValueError: If the data is not fully parsable.
+    """
+    _populate(pokeset, skip_ev_check, diagnostics, generation, build=False)
+
+
+def _populate(pokeset, skip_ev_check, diagnostics, generation, build, required=None):
     # I am sorry that this function is so big and partly copy-pasted,
     # but it just does a lot of equally boring things like processing
     # special cases. I couldn't come up with a structure that wouldn't
     # just feel forced. It could be better, but it could also be worse,
     # and to be honest it's easy enough to maintain (for me at least).
     
-    # make deepcopy to not modify original data
-    pokeset = deepcopy(pokeset)
+    # no-op unless a profiler is active
+    timer = profiling.start_timer()
+    report = diagnostics.report if diagnostics is not None else warn_diagnostic
+    gen = get_generation(generation)
+
+    def want(field):
+        return required is None or field in required
+
+    # make deepcopy to not modify original data.
+    # when only validating, nested data isn't modified and a shallow copy suffices
+    pokeset = deepcopy(pokeset) if build else dict(pokeset)
     
     # check if there are wrongly capitalized keys
     for key, value in list(pokeset.items()):
         key_lower = key.lower()
         if key_lower != key:
-            warn("Key should be all lowercase: %s" % key)
+            report(DiagnosticCode.LOWERCASE_KEY, "Key should be all lowercase: %s" % key, key=key)
             del pokeset[key]
             pokeset[key_lower] = value
 
@@ -109,7 +234,7 @@ def populate_pokeset(pokeset, skip_ev_check=False):
     # fill in optional fields
     for key, default in _OPTIONAL_FIELDS.items():
         if key not in pokeset:
-            pokeset[key] = deepcopy(default)
+            pokeset[key] = deepcopy(default) if build else default
 
     # parse suppressions
     suppressions = set()
@@ -134,16 +259,20 @@ def populate_pokeset(pokeset, skip_ev_check=False):
         custom_displayname = True
         if not pokeset["displayname"] or not isinstance(pokeset["displayname"], str):
             raise ValueError("displayname, if set, must be a non-empty string")
+    timer.lap("fields")
 
     # check and populate species
     species_raw = pokeset["species"]
     if species_raw is None:
         raise ValueError("Invalid species: %s" % (species_raw,))
-    species, perfect_match = _get_by_index_or_name(gen4data.POKEDEX, species_raw,
-                                                   "species", gen4data.get_pokemon, gen4data.find_pokemon)
+    species, perfect_match = _get_by_index_or_name(gen.pokedex, species_raw,
+                                                   "species", gen.get_pokemon, gen.find_pokemon, copy=build)
     if not perfect_match:
-        warn("Didn't recognize species %s, but assumed %s." % (species_raw, species["name"]))
+        report(DiagnosticCode.AUTOCORRECTED,
+               "Didn't recognize species %s, but assumed %s." % (species_raw, species["name"]),
+               field="species", given=species_raw, assumed=species["name"])
     pokeset["species"] = species
+    timer.lap("species")
 
     # check tags
     tags = pokeset["tags"]
@@ -162,22 +291,26 @@ def populate_pokeset(pokeset, skip_ev_check=False):
     if not isinstance(pokeset["happiness"], int):
         raise ValueError("happiness must be a number.")
 
-    # check and populate ability. is a list
-    ability = []
-    ability_raw = pokeset["ability"]
-    if not isinstance(ability_raw, list):
-        ability_raw = [ability_raw]
-    if not ability_raw:
-        raise ValueError("List of possible abilities cannot be empty.")
-    for ability_raw_single in ability_raw:
-        ability_single, perfect_match = _get_by_index_or_name(gen4data.ABILITIES, ability_raw_single,
-                                                              "ability", gen4data.get_ability, gen4data.find_ability)
-        if not perfect_match:
-            warn("Didn't recognize ability %s, but assumed %s." % (ability_raw_single, ability_single["name"]))
-        ability.append(ability_single)
-    if len(set(a["id"] for a in ability)) < len(ability):
-        raise ValueError("All abilities supplied must be unique: %s" % ", ".join(a["name"] for a in ability))
-    pokeset["ability"] = ability
+    if want("ability"):
+        # check and populate ability. is a list
+        ability = []
+        ability_raw = pokeset["ability"]
+        if not isinstance(ability_raw, list):
+            ability_raw = [ability_raw]
+        if not ability_raw:
+            raise ValueError("List of possible abilities cannot be empty.")
+        for ability_raw_single in ability_raw:
+            ability_single, perfect_match = _get_by_index_or_name(gen.abilities, ability_raw_single,
+                                                                  "ability", gen.get_ability, gen.find_ability, copy=build)
+            if not perfect_match:
+                report(DiagnosticCode.AUTOCORRECTED,
+                       "Didn't recognize ability %s, but assumed %s." % (ability_raw_single, ability_single["name"]),
+                       field="ability", given=ability_raw_single, assumed=ability_single["name"])
+            ability.append(ability_single)
+        if len(set(a["id"] for a in ability)) < len(ability):
+            raise ValueError("All abilities supplied must be unique: %s" % ", ".join(a["name"] for a in ability))
+        pokeset["ability"] = ability
+        timer.lap("ability")
 
     # check and populate item. is a list
     item = []
@@ -187,163 +320,189 @@ def populate_pokeset(pokeset, skip_ev_check=False):
     if not item_raw:
         raise ValueError("List of possible items cannot be empty.")
     for item_raw_single in item_raw:
-        item_single, perfect_match = _get_by_index_or_name(gen4data.ITEMS, item_raw_single,
-                                                           "item", gen4data.get_item, gen4data.find_item)
+        item_single, perfect_match = _get_by_index_or_name(gen.items, item_raw_single,
+                                                           "item", gen.get_item, gen.find_item, copy=build)
         if not perfect_match:
-            warn("Didn't recognize item %s, but assumed %s." % (item_raw_single, item_single["name"]))
+            report(DiagnosticCode.AUTOCORRECTED,
+                   "Didn't recognize item %s, but assumed %s." % (item_raw_single, item_single["name"]),
+                   field="item", given=item_raw_single, assumed=item_single["name"])
         item.append(item_single)
     if len(set(i["id"] for i in item)) < len(item):
         raise ValueError("All items supplied must be unique: %s" % ", ".join(i["name"] for i in item))
     pokeset["item"] = item
-
-    # check and populate ball. is a list
-    ball = []
-    ball_raw = pokeset["ball"]
-    if not isinstance(ball_raw, list):
-        ball_raw = [ball_raw]
-    if not ball_raw:
-        raise ValueError("List of possible balls cannot be empty.")
-    for ball_raw_single in ball_raw:
-        ball_single, perfect_match = _get_by_index_or_name(gen4data.ITEMS, ball_raw_single,
-                                                           "ball", gen4data.get_ball, gen4data.find_ball)
-        if not ball_single["name"].endswith(" Ball"):
-            raise ValueError("Invalid ball: %s" % ball_single)
-        if not perfect_match:
-            warn("Didn't recognize ball %s, but assumed %s." % (ball_raw_single, ball_single["name"]))
-        ball.append(ball_single)
-    if len(set(b["name"] for b in ball)) < len(ball):
-        raise ValueError("All balls supplied must be unique: %s" % ", ".join(b["name"] for b in ball))
-    pokeset["ball"] = ball
-
-    # check gender
-    gender = pokeset["gender"]
-    if not isinstance(gender, list):
-        gender = [gender]
-    if not gender:
-        raise ValueError("List of possible genders cannot be empty.")
-    for gender_single in gender:
-        if gender_single not in ("m", "f", None):
-            raise ValueError("gender can only be 'm', 'f' or not set (null), but not %s" % (gender_single,))
-    if len(gender) > 1 and None in gender:
-        raise ValueError("non-gender cannot be mixed with m/f")
-    if len(set(gender)) < len(gender):
-        raise ValueError("All genders supplied must be unique: %s" % ", ".join(gender))
-    pokeset["gender"] = gender
+    timer.lap("item")
+
+    if want("ball"):
+        # check and populate ball. is a list
+        ball = []
+        ball_raw = pokeset["ball"]
+        if not isinstance(ball_raw, list):
+            ball_raw = [ball_raw]
+        if not ball_raw:
+            raise ValueError("List of possible balls cannot be empty.")
+        for ball_raw_single in ball_raw:
+            ball_single, perfect_match = _get_by_index_or_name(gen.items, ball_raw_single,
+                                                               "ball", gen.get_ball, gen.find_ball, copy=build)
+            if not ball_single["name"].endswith(" Ball"):
+                raise ValueError("Invalid ball: %s" % ball_single)
+            if not perfect_match:
+                report(DiagnosticCode.AUTOCORRECTED,
+                       "Didn't recognize ball %s, but assumed %s." % (ball_raw_single, ball_single["name"]),
+                       field="ball", given=ball_raw_single, assumed=ball_single["name"])
+            ball.append(ball_single)
+        if len(set(b["name"] for b in ball)) < len(ball):
+            raise ValueError("All balls supplied must be unique: %s" % ", ".join(b["name"] for b in ball))
+        pokeset["ball"] = ball
+        timer.lap("ball")
+
+    if want("gender"):
+        # check gender
+        gender = pokeset["gender"]
+        if not isinstance(gender, list):
+            gender = [gender]
+        if not gender:
+            raise ValueError("List of possible genders cannot be empty.")
+        for gender_single in gender:
+            if gender_single not in ("m", "f", None):
+                raise ValueError("gender can only be 'm', 'f' or not set (null), but not %s" % (gender_single,))
+        if len(gender) > 1 and None in gender:
+            raise ValueError("non-gender cannot be mixed with m/f")
+        if len(set(gender)) < len(gender):
+            raise ValueError("All genders supplied must be unique: %s" % ", ".join(gender))
+        pokeset["gender"] = gender
 
     # check level
     level = pokeset["level"]
     if not (isinstance(level, int) and 1 <= level <= 100):
         raise ValueError("level must be a number between 1 and 100")
-
-    # check and populate nature. might be defined as "+atk -def" or similar
-    nature_raw = pokeset["nature"]
-    if not isinstance(nature_raw, str):
-        raise ValueError("Invalid nature: %s" % (nature_raw,))
-    stats_regex = "|".join(stats.statnames)
-    match = re.match(r"^\+({0})\s+-((?:\1){0})$".format(stats_regex), nature_raw)
-    if match:
-        increased = match.group(1)
-        decreased = match.group(2)
-        matching_nature = [n for n in gen4data.NATURES if n["increased"] == increased and n["decreased"] == decreased]
-        if matching_nature:
-            nature_raw = matching_nature[0]["name"]
-    nature, perfect_match = _get_by_index_or_name(gen4data.NATURES, nature_raw,
-                                                  "nature", gen4data.get_nature, gen4data.find_nature)
-    if not perfect_match:
-        warn("Didn't recognize nature %s, but assumed %s." % (nature_raw, nature["name"]))
-    pokeset["nature"] = nature
-
-    # check IVs
-    ivs = pokeset["ivs"]
-    if isinstance(ivs, int):
-        ivs = {name: ivs for name in stats.statnames}
-    if not isinstance(ivs, dict):
-        raise ValueError("Invalid IVs: %s" % (ivs,))
-    if set(stats.statnames) != set(ivs.keys()):
-        raise ValueError("ivs must contain the following keys: %s" % ", ".join(stats.statnames))
-    if not all(isinstance(v, int) for v in ivs.values()):
-        raise ValueError("Invalid IV value in IVs: %s" % (ivs,))
-    if not all(0 <= val <= 31 for val in ivs.values()):
-        raise ValueError("All IVs must be between 0 and 31.")
-    pokeset["ivs"] = ivs
-    # check EVs
-    evs = pokeset["evs"]
-    if isinstance(evs, int):
-        evs = {name: evs for name in stats.statnames}
-    if not isinstance(evs, dict):
-        raise ValueError("Invalid EVs: %s" % (evs,))
-    if set(stats.statnames) != set(evs.keys()):
-        raise ValueError("evs must contain the following keys: %s" % ", ".join(stats.statnames))
-    if not all(isinstance(v, int) for v in evs.values()):
-        raise ValueError("Invalid EV value in EVs: %s" % (evs,))
-    if not all(0 <= val for val in evs.values()):
-        raise ValueError("All EVs must be >= 0.")
-    if not all(val <= 252 for val in evs.values()) and Suppressions.INVALID_EVS not in suppressions:
-        message = "All EVs must be <= 252."
-        if skip_ev_check:
-            warn(message)
-        else:
-            raise ValueError(message)
-    ev_sum = sum(val for val in evs.values())
-    if ev_sum > 510 and Suppressions.INVALID_EVS not in suppressions:
-        message = "Sum of EV must not be larger than 510, but is %d" % ev_sum
-        if skip_ev_check:
-            warn(message)
-        else:
-            raise ValueError(message)
-    for key, value in evs.items():
-        if value % 4 != 0 and Suppressions.WASTED_EVS not in suppressions:
-            warn("EV for %s is %d, which is not a multiple of 4 (wasted points)" % (key, value))
-    pokeset["evs"] = evs
-
-    # TODO outsorce singular move procession
-    # check and populate moves
-    moves = []
-    moves_raw = pokeset["moves"]
-    if not 1 <= len(moves_raw) <= 4:
-        raise ValueError("Pokémon must have between 1 and 4 moves, but has %d" % len(moves_raw))
-    guaranteed_moves_ids = []
-    for slot_index, move_raw in enumerate(moves_raw):
-        move = []
-        if not isinstance(move_raw, list):
-            move_raw = [move_raw]
-        if not move_raw:
-            raise ValueError("List of possible moves in slot {} cannot be empty.".format(slot_index+1))
-        for move_raw_single in move_raw:
-            pp = None
-            pp_ups = 0
-            # move might have pp-up and fixed pp information
-            pp_info = re.search(r"\(\+\d+\)|\(=\d+\)|\(\+\d+/=\d+\)$", move_raw_single)
-            if pp_info:
-                move_raw_single = move_raw_single[:pp_info.start()-1]
-                for bit in pp_info.group(0).strip("()").split("/"):
-                    if bit.startswith("+"):
-                        pp_ups = int(bit[1:])
-                    elif bit.startswith("="):
-                        pp = int(bit[1:])
-            move_single, perfect_match = _get_by_index_or_name(gen4data.MOVES, move_raw_single, "move", gen4data.get_move, gen4data.find_move)
-            if not perfect_match:
-                warn("Didn't recognize move %s, but assumed %s." % (move_raw_single, move_single["name"]))
-            move_single["pp_ups"] = pp_ups
-            pp = pp or move_single["pp"]
-            pp = int(pp * (1 + 0.2 * pp_ups))
-            move_single["pp"] = pp
-            move.append(move_single)
-        if len(move) == 1 and Suppressions.DUPLICATE_MOVES not in suppressions:
-            move_id = move[0]["id"]
-            if guaranteed_moves_ids.count(move_id) == 1:
-                warn("Move {} is guaranteed to occupy multiple slots (possible stallmate due to PP-bug).".format(move[0]["name"]))
-            guaranteed_moves_ids.append(move_id)
-        moves.append(move)
-    pokeset["moves"] = moves
+    timer.lap("gender/level")
+
+    if want("nature"):
+        # check and populate nature. might be defined as "+atk -def" or similar
+        nature_raw = pokeset["nature"]
+        if not isinstance(nature_raw, str):
+            raise ValueError("Invalid nature: %s" % (nature_raw,))
+        stats_regex = "|".join(stats.statnames)
+        match = re.match(r"^\+({0})\s+-((?:\1){0})$".format(stats_regex), nature_raw)
+        if match:
+            increased = match.group(1)
+            decreased = match.group(2)
+            matching_nature = [n for n in gen.natures if n["increased"] == increased and n["decreased"] == decreased]
+            if matching_nature:
+                nature_raw = matching_nature[0]["name"]
+        nature, perfect_match = _get_by_index_or_name(gen.natures, nature_raw,
+                                                      "nature", gen.get_nature, gen.find_nature, copy=build)
+        if not perfect_match:
+            report(DiagnosticCode.AUTOCORRECTED,
+                   "Didn't recognize nature %s, but assumed %s." % (nature_raw, nature["name"]),
+                   field="nature", given=nature_raw, assumed=nature["name"])
+        pokeset["nature"] = nature
+        timer.lap("nature")
+
+    if want("ivs") or want("evs"):
+        # check IVs
+        ivs = pokeset["ivs"]
+        if isinstance(ivs, int):
+            ivs = {name: ivs for name in stats.statnames}
+        if not isinstance(ivs, dict):
+            raise ValueError("Invalid IVs: %s" % (ivs,))
+        if set(stats.statnames) != set(ivs.keys()):
+            raise ValueError("ivs must contain the following keys: %s" % ", ".join(stats.statnames))
+        if not all(isinstance(v, int) for v in ivs.values()):
+            raise ValueError("Invalid IV value in IVs: %s" % (ivs,))
+        if not all(0 <= val <= 31 for val in ivs.values()):
+            raise ValueError("All IVs must be between 0 and 31.")
+        pokeset["ivs"] = ivs
+        # check EVs
+        evs = pokeset["evs"]
+        if isinstance(evs, int):
+            evs = {name: evs for name in stats.statnames}
+        if not isinstance(evs, dict):
+            raise ValueError("Invalid EVs: %s" % (evs,))
+        if set(stats.statnames) != set(evs.keys()):
+            raise ValueError("evs must contain the following keys: %s" % ", ".join(stats.statnames))
+        if not all(isinstance(v, int) for v in evs.values()):
+            raise ValueError("Invalid EV value in EVs: %s" % (evs,))
+        if not all(0 <= val for val in evs.values()):
+            raise ValueError("All EVs must be >= 0.")
+        if not all(val <= 252 for val in evs.values()) and Suppressions.INVALID_EVS not in suppressions:
+            message = "All EVs must be <= 252."
+            if skip_ev_check:
+                report(DiagnosticCode.INVALID_EVS, message, evs=evs)
+            else:
+                raise ValueError(message)
+        ev_sum = sum(val for val in evs.values())
+        if ev_sum > 510 and Suppressions.INVALID_EVS not in suppressions:
+            message = "Sum of EV must not be larger than 510, but is %d" % ev_sum
+            if skip_ev_check:
+                report(DiagnosticCode.INVALID_EVS, message, evs=evs)
+            else:
+                raise ValueError(message)
+        for key, value in evs.items():
+            if value % 4 != 0 and Suppressions.WASTED_EVS not in suppressions:
+                report(DiagnosticCode.WASTED_EVS,
+                       "EV for %s is %d, which is not a multiple of 4 (wasted points)" % (key, value),
+                       stat=key, value=value)
+        pokeset["evs"] = evs
+        timer.lap("ivs/evs")
+
+    if want("moves"):
+        # TODO outsorce singular move procession
+        # check and populate moves
+        moves = []
+        moves_raw = pokeset["moves"]
+        if not 1 <= len(moves_raw) <= 4:
+            raise ValueError("Pokémon must have between 1 and 4 moves, but has %d" % len(moves_raw))
+        guaranteed_moves_ids = []
+        for slot_index, move_raw in enumerate(moves_raw):
+            move = []
+            if not isinstance(move_raw, list):
+                move_raw = [move_raw]
+            if not move_raw:
+                raise ValueError("List of possible moves in slot {} cannot be empty.".format(slot_index+1))
+            for move_raw_single in move_raw:
+                pp = None
+                pp_ups = 0
+                # move might have pp-up and fixed pp information
+                pp_info = re.search(r"\(\+\d+\)|\(=\d+\)|\(\+\d+/=\d+\)$", move_raw_single)
+                if pp_info:
+                    move_raw_single = move_raw_single[:pp_info.start()-1]
+                    for bit in pp_info.group(0).strip("()").split("/"):
+                        if bit.startswith("+"):
+                            pp_ups = int(bit[1:])
+                        elif bit.startswith("="):
+                            pp = int(bit[1:])
+                move_single, perfect_match = _get_by_index_or_name(gen.moves, move_raw_single, "move", gen.get_move, gen.find_move, copy=build)
+                if not perfect_match:
+                    report(DiagnosticCode.AUTOCORRECTED,
+                           "Didn't recognize move %s, but assumed %s." % (move_raw_single, move_single["name"]),
+                           field="moves", given=move_raw_single, assumed=move_single["name"])
+                if build:
+                    move_single["pp_ups"] = pp_ups
+                    pp = pp or move_single["pp"]
+                    pp = int(pp * (1 + 0.2 * pp_ups))
+                    move_single["pp"] = pp
+                move.append(move_single)
+            if len(move) == 1 and Suppressions.DUPLICATE_MOVES not in suppressions:
+                move_id = move[0]["id"]
+                if guaranteed_moves_ids.count(move_id) == 1:
+                    report(DiagnosticCode.DUPLICATE_MOVES,
+                           "Move {} is guaranteed to occupy multiple slots (possible stallmate due to PP-bug).".format(move[0]["name"]),
+                           move=move[0]["name"])
+                guaranteed_moves_ids.append(move_id)
+            moves.append(move)
+        pokeset["moves"] = moves
+        timer.lap("moves")
 
     # check rarity
     rarity = pokeset["rarity"]
     if not (isinstance(rarity, (int, float)) and rarity >= 0.0):
         raise ValueError("rarity must be a number greater or equal to 0.0")
     if rarity > 10.0:
-        warn("rarity is %d, which is surprisingly high. Note that 1.0 is the default "
-             "and high values mean the Pokémon gets chosen more often." % rarity)
+        report(DiagnosticCode.HIGH_RARITY,
+               "rarity is %d, which is surprisingly high. Note that 1.0 is the default "
+               "and high values mean the Pokémon gets chosen more often." % rarity,
+               rarity=rarity)
 
     # fix default biddable value
     if pokeset["biddable"] is None:
@@ -358,11 +517,15 @@ def populate_pokeset(pokeset, skip_ev_check=False):
         raise ValueError("hidden must be a boolean (true or false), not %s" % type(pokeset["hidden"]))
 
     if pokeset["biddable"] and pokeset["hidden"]:
-        warn("Set is biddable, but also hidden, which doesn't make sense.")
+        report(DiagnosticCode.HIDDEN_BIDDABLE, "Set is biddable, but also hidden, which doesn't make sense.")
     if pokeset["shiny"] and pokeset["biddable"] and Suppressions.PUBLIC_SHINY not in suppressions:
-        warn("Set is shiny, but also biddable, which means it can be used in token matches. Is this intended?")
+        report(DiagnosticCode.PUBLIC_SHINY,
+               "Set is shiny, but also biddable, which means it can be used in token matches. Is this intended?",
+               biddable=True, hidden=pokeset["hidden"])
     if pokeset["shiny"] and not pokeset["hidden"] and Suppressions.PUBLIC_SHINY not in suppressions:
-        warn("Set is shiny, but not hidden, which means it is publicly visible. Is this intended?")
+        report(DiagnosticCode.PUBLIC_SHINY,
+               "Set is shiny, but not hidden, which means it is publicly visible. Is this intended?",
+               biddable=pokeset["biddable"], hidden=False)
 
     # fix displayname
     if pokeset["displayname"] is None:
@@ -383,135 +546,142 @@ def populate_pokeset(pokeset, skip_ev_check=False):
     if formname is None and form != 0:
         raise ValueError("Species %s has no form %s." % (species["name"], form))
 
-    apply_pokeset_form_adjustments(pokeset)
+    timer.lap("flags")
 
-    # add stats
-    pokeset["stats"] = {}
-    for statname in stats.statnames:
-        basestat = species["basestats"][statname]
-        ev = evs[statname]
-        iv = ivs[statname]
-        level = pokeset["level"]
-        pokeset["stats"][statname] = stats.calculate_stat(basestat, ev, iv, statname, nature, level)
-
-    # check and populate curr_hp
-    curr_hp = pokeset["curr_hp"]
-    if curr_hp is None:
-        curr_hp = pokeset["stats"]["hp"]
-    if not isinstance(curr_hp, int):
-        raise ValueError("curr_hp must be a number.")
-    pokeset["curr_hp"] = curr_hp
-
-    # check and populate status
-    if pokeset["status"] is not None:
-        raise NotImplementedError("assignable status isn't implemented yet.")
-    pokeset["status"] = {
-        "nonvolatile": {
-            "slp": 0,
-            "psn": False,
-            "brn": False,
-            "frz": False,
-            "par": False,
-            "tox": 0,
-        }, 
-        "volatile": {
-            "cnf": 0,
-            "cur": False,  # curse
-            "inf": False,  # infatuation
-            "foc": False,  # focus energy
-            "tau": False,  # taunt
-            "tor": False,  # torment
-        }
-    }
-
-    # check and populate curr_hp
-    curr_hp = pokeset["curr_hp"]
-    if curr_hp is None:
-        curr_hp = pokeset["stats"]["hp"]
-    if not isinstance(curr_hp, int):
-        raise ValueError("curr_hp must be a number.")
-    pokeset["curr_hp"] = curr_hp
-
-    # add autogenerated tags
-    if pokeset["biddable"]:
-        pokeset["tags"].append("biddable")
-    if pokeset["hidden"]:
-        pokeset["tags"].append("hidden")
-    if pokeset["shiny"]:
-        pokeset["tags"].append("shiny")
-    pokeset["tags"].append("species+%d" % pokeset["species"]["id"])
-    pokeset["tags"].append("species+%s" % pokeset["species"]["name"])
-    for type_ in pokeset["species"]["types"]:
-        pokeset["tags"].append("type+%s" % type_)
-    pokeset["tags"].append("color+%s" % pokeset["species"]["color"])
-    pokeset["tags"].append("level+%d" % pokeset["level"])
-    pokeset["tags"].append("form+%d" % pokeset["form"])
-
-    for ability_ in pokeset["ability"]:
-        if ability_:
-            pokeset["tags"].append("ability+%s" % str(ability_["name"]))
-    pokeset["tags"].append("setname+%s" % pokeset["setname"])
-
-    # ensure no duplicate tags
-    pokeset["tags"] = sorted(set(pokeset["tags"]))
-
-    # check combinations and separations
-    combinations = pokeset["combinations"]
-    if not isinstance(combinations, list) or not all(isinstance(c, list) for c in combinations):
-        raise ValueError("combinations must be a list of lists.")
-    if not all(isinstance(s, str) or s is None for s in chain(*combinations)):
-        raise ValueError("combination items must be strings or null")
-    separations = pokeset["separations"]
-    if not isinstance(separations, list) or not all(isinstance(s, list) for s in separations):
-        raise ValueError("separations must be a list of lists.")
-    if not all(isinstance(s, str) or s is None for s in chain(*separations)):
-        raise ValueError("separation items must be strings or null")
-    movenames = sum([movelist for movelist in pokeset["moves"]], [])
-    movenames = list(set(move["name"] for move in movenames))
-    all_things = (movenames
-                  + [p["name"] for p in pokeset["item"]]
-                  + [a["name"] for a in pokeset["ability"]])
-    ambiguities = set(item for item, count in Counter(all_things).items() if count > 1)
-    all_things = set(all_things)
-    for com in combinations:
-        if any(c in ambiguities for c in com):
-            raise ValueError("Can't use %s in combinations, as it is ambiguous." % (com,))
-        rest = [item for item in com if item not in all_things]
-        for r in list(rest):
-            if not r:
-                continue
-            for thing in all_things - {None}:
-                if ratio(thing.lower(), r.lower()) > 0.9:
-                    if is_difference_significant(thing, r):
-                        warn("Didn't recognize combination %s, but assumed %s." % (r, thing))
-                    rest.remove(r)
-                    com.remove(r)
-                    com.append(thing)
-                    break
-        if rest:
-            raise ValueError("All things referenced in combination must be present in set. Missing: %s" % ", ".join(rest))
-    for sep in separations:
-        if any(s in ambiguities for s in sep):
-            raise ValueError("Can't use %s in separations, as it is ambiguous." % (sep,))
-        rest = [item for item in sep if item not in all_things]
-        for r in list(rest):
-            if not r:
-                continue
-            for thing in all_things - {None}:
-                if ratio(thing.lower(), r.lower()) > 0.9:
-                    if is_difference_significant(thing, r):
-                        warn("Didn't recognize separation %s, but assumed %s." % (r, thing))
-                    rest.remove(r)
-                    sep.remove(r)
-                    sep.append(thing)
-                    break
-        if rest:
-            raise ValueError("All things referenced in separation must be present in set. Missing: %s" % ", ".join(rest))
-    # TODO validate that the combinations and separations even allow for a functioning set to be generated
+    # when only validating, the species is the data table's entry, and gets replaced by the
+    # shared adjusted species of its form. otherwise it is a copy and replaced by another copy
+    apply_pokeset_form_adjustments(pokeset, gen, copy=build)
+    species = pokeset["species"]
+    timer.lap("forms")
+
+    if not build:
+        # everything below only builds output, except for these checks
+        if pokeset["curr_hp"] is not None and not isinstance(pokeset["curr_hp"], int):
+            raise ValueError("curr_hp must be a number.")
+        if pokeset["status"] is not None:
+            raise NotImplementedError("assignable status isn't implemented yet.")
+    else:
+        if want("stats"):
+            # add stats
+            pokeset["stats"] = {}
+            for statname in stats.statnames:
+                basestat = species["basestats"][statname]
+                ev = evs[statname]
+                iv = ivs[statname]
+                level = pokeset["level"]
+                pokeset["stats"][statname] = stats.calculate_stat(basestat, ev, iv, statname, nature, level)
+            timer.lap("stats")
+
+        if want("curr_hp"):
+            # check and populate curr_hp
+            curr_hp = pokeset["curr_hp"]
+            if curr_hp is None:
+                curr_hp = pokeset["stats"]["hp"]
+            if not isinstance(curr_hp, int):
+                raise ValueError("curr_hp must be a number.")
+            pokeset["curr_hp"] = curr_hp
+
+        # check and populate status
+        if pokeset["status"] is not None:
+            raise NotImplementedError("assignable status isn't implemented yet.")
+        if want("status"):
+            pokeset["status"] = _new_status()
+        timer.lap("status")
+
+        if want("tags"):
+            # add autogenerated tags
+            _add_generated_tags(pokeset)
+    timer.lap("tags")
+
+    if want("combinations") or want("separations"):
+        # check combinations and separations
+        combinations = pokeset["combinations"]
+        if not isinstance(combinations, list) or not all(isinstance(c, list) for c in combinations):
+            raise ValueError("combinations must be a list of lists.")
+        if not all(isinstance(s, str) or s is None for s in chain(*combinations)):
+            raise ValueError("combination items must be strings or null")
+        combinations = pokeset["combinations"] = [list(c) for c in combinations]
+        separations = pokeset["separations"]
+        if not isinstance(separations, list) or not all(isinstance(s, list) for s in separations):
+            raise ValueError("separations must be a list of lists.")
+        if not all(isinstance(s, str) or s is None for s in chain(*separations)):
+            raise ValueError("separation items must be strings or null")
+        separations = pokeset["separations"] = [list(s) for s in separations]
+        movenames = sum([movelist for movelist in pokeset["moves"]], [])
+        movenames = list(set(move["name"] for move in movenames))
+        all_things = (movenames
+                      + [p["name"] for p in pokeset["item"]]
+                      + [a["name"] for a in pokeset["ability"]])
+        ambiguities = set(item for item, count in Counter(all_things).items() if count > 1)
+        all_things = set(all_things)
+        for com in combinations:
+            if any(c in ambiguities for c in com):
+                raise ValueError("Can't use %s in combinations, as it is ambiguous." % (com,))
+            rest = [item for item in com if item not in all_things]
+            for r in list(rest):
+                if not r:
+                    continue
+                for thing in all_things - {None}:
+                    if ratio(thing.lower(), r.lower()) > 0.9:
+                        if is_difference_significant(thing, r):
+                            report(DiagnosticCode.AUTOCORRECTED,
+                                   "Didn't recognize combination %s, but assumed %s." % (r, thing),
+                                   field="combinations", given=r, assumed=thing)
+                        rest.remove(r)
+                        com.remove(r)
+                        com.append(thing)
+                        break
+            if rest:
+                raise ValueError("All things referenced in combination must be present in set. Missing: %s" % ", ".join(rest))
+        for sep in separations:
+            if any(s in ambiguities for s in sep):
+                raise ValueError("Can't use %s in separations, as it is ambiguous." % (sep,))
+            rest = [item for item in sep if item not in all_things]
+            for r in list(rest):
+                if not r:
+                    continue
+                for thing in all_things - {None}:
+                    if ratio(thing.lower(), r.lower()) > 0.9:
+                        if is_difference_significant(thing, r):
+                            report(DiagnosticCode.AUTOCORRECTED,
+                                   "Didn't recognize separation %s, but assumed %s." % (r, thing),
+                                   field="separations", given=r, assumed=thing)
+                        rest.remove(r)
+                        sep.remove(r)
+                        sep.append(thing)
+                        break
+            if rest:
+                raise ValueError("All things referenced in separation must be present in set. Missing: %s" % ", ".join(rest))
+        timer.lap("combinations")
+
+        # validate that the combinations and separations even allow for a functioning set to be generated
+        analysis = analyze_restrictions(pokeset)
+        if not analysis.valid_count:
+            raise ValueError("combinations and separations don't allow for any valid instance of this set")
+        if analysis.valid_fraction < _FEASIBILITY_WARN_FRACTION:
+            report(DiagnosticCode.UNLIKELY_RESTRICTIONS,
+                   "Only %d of %d possible instances (%.2f%%) respect the combinations and separations, "
+                   "instantiating this set may need many rerolls."
+                   % (analysis.valid_count, analysis.possible_count, 100 * analysis.valid_fraction),
+                   valid_count=analysis.valid_count, possible_count=analysis.possible_count)
+        timer.lap("feasibility")
+    timer.finish("%s %s" % (species["name"], pokeset["setname"]))
     return pokeset
 
 
-def apply_pokeset_form_adjustments(pokeset):
+def apply_pokeset_form_adjustments(pokeset, generation=None, copy=True):
+    """
+    Replaces a set's species with the one adjusted to its form (basestats, types
+    and color, see `forms`), and appends the formname to a default displayname.
+    The adjusted species come precomputed from the generation. Stats only get
+    recalculated if the set already has them.
+
+    Arguments:
+        pokeset: set with a populated species and item.
+        generation: Defaults to None, which is generation 4.
+        copy: Defaults to True. If False, the species is the shared adjusted species,
+              which must not be modified.
+    """
     form = pokeset["form"]
     species = pokeset["species"]
 
@@ -520,53 +690,26 @@ def apply_pokeset_form_adjustments(pokeset):
             pokeset["displayname"] != species["name"]):
         custom_displayname = True
 
-    # special case: all forms. fix displayname
-    formname = forms.get_formname(species["id"], form)
+    item_name = None
+    if forms.has_item_forms(species["id"]):
+        # e.g. Arceus, whose form depends on its plate
+        item = pokeset["item"]
+        if type(item) is list:
+            if len(item) > 1:
+                raise ValueError("%s currently must have a fixed item" % species["name"])
+            item = item[0]
+        item_name = item["name"]
+
+    gen = get_generation(generation)
+    adjusted, formname = gen.form_species(species["id"], form, item_name)
     if formname and not custom_displayname:
-        pokeset["displayname"] =  species["name"] + " " + formname
-
-    # special case: Deoxys. Fix basestats (displayname already fixed)
-    if species["name"] == "Deoxys":
-        deoxys_form = forms.get_formname(species["id"], form)
-        species["basestats"] = gen4data.DEOXYS_BASESTATS[deoxys_form]
-        recalculate_pokeset_stats(pokeset)
-    elif species["name"] == "Wormadam":
-        wormadam_form = forms.get_formname(species["id"], form)
-        species["basestats"] = gen4data.WORMADAM_BASESTATS[wormadam_form]
+        pokeset["displayname"] = species["name"] + " " + formname
+    if adjusted is gen.pokedex[species["id"]]:
+        return  # the form changes nothing but the displayname
+    pokeset["species"] = deepcopy(adjusted) if copy else adjusted
+    if adjusted["basestats"] != species["basestats"]:
         recalculate_pokeset_stats(pokeset)
 
-    # special case: Wormadam. Fix type
-    if species["name"] == "Wormadam":
-        wormadam_types = ("Grass", "Ground", "Steel")
-        pokeset["species"]["types"] = ["Bug", wormadam_types[form]]
-
-    if species["name"] in ["Burmy", "Wormadam"]:
-        colors = ("Green", "Brown", "Pink")
-        pokeset["species"]["color"] = colors[form]
-
-    if species["name"] in ["Shellos", "Gastrodon"]:
-        colors = ("Pink", "Blue")
-        pokeset["species"]["color"] = colors[form]
-
-    # special case: Arceus. Handle as form. Also fix type
-    if species["name"] == "Arceus":
-        if "ability" in species and species["ability"]["name"] != "Multitype":
-            pokeset["species"]["types"] = ["Normal"]
-            if not custom_displayname:
-                pokeset["displayname"] = species["name"]
-        else:
-            item = pokeset["item"]
-            if type(item) is list:
-                if len(item) > 1:
-                    raise ValueError("Arceus currently must have a fixed item")
-                item = item[0]
-            arceus_type = forms.get_multitype_type(item)
-            pokeset["species"]["types"] = [arceus_type]
-            arceus_color = forms.get_multitype_color(item)
-            pokeset["species"]["color"] = [arceus_color]
-            if not custom_displayname:
-                pokeset["displayname"] = species["name"] + " " + arceus_type
-
 
 _target_translations_doubles = {
     "self":                 (0, ),
@@ -628,6 +771,84 @@ def _check_restrictions(pokeset):
     return True
 
 
+RestrictionAnalysis = namedtuple("RestrictionAnalysis", ["valid_count", "possible_count", "valid_fraction", "marginals"])
+
+# stands in for all options of a slot that aren't referenced by any restriction
+_UNRESTRICTED = object()
+
+
+def analyze_restrictions(pokeset):
+    """
+    Counts exactly how many of the possible instances of a populated set respect
+    the "Combinations" and "Separations" defined in it, and how likely each option
+    is to be picked by `instantiate_pokeset`, which picks uniformly among those.
+    Options not referenced by any restriction are interchangeable and get counted
+    as one group, so this stays cheap for sets with many options.
+
+    Returns:
+        A RestrictionAnalysis with the number of valid and possible instances,
+        the fraction of valid ones and the marginal probabilities. The marginals are
+        a dict with keys "item", "ability", "ball", "gender" and "moves", containing
+        a probability for each option in the same order as in the populated set.
+        For "moves", this is a list of such lists, one per slot.
+    """
+    referenced = set(chain(*pokeset["combinations"], *pokeset["separations"]))
+    slots = [pokeset["item"], pokeset["ability"]] + pokeset["moves"]
+    # group each slot's options by the name relevant for the restrictions
+    slot_groups = []
+    for options in slots:
+        groups = {}
+        for index, option in enumerate(options):
+            key = option["name"] if option["name"] in referenced else _UNRESTRICTED
+            groups.setdefault(key, []).append(index)
+        slot_groups.append(list(groups.items()))
+    valid_weight = 0
+    group_weights = [[0] * len(groups) for groups in slot_groups]
+    for choice in product(*(range(len(groups)) for groups in slot_groups)):
+        keys = [slot_groups[slot][group][0] for slot, group in enumerate(choice)]
+        candidate = {
+            "item": {"name": keys[0]},
+            "ability": {"name": keys[1]},
+            "moves": [{"name": key} for key in keys[2:]],
+            "combinations": pokeset["combinations"],
+            "separations": pokeset["separations"],
+        }
+        if not _check_restrictions(candidate):
+            continue
+        weight = 1
+        for slot, group in enumerate(choice):
+            weight *= len(slot_groups[slot][group][1])
+        valid_weight += weight
+        for slot, group in enumerate(choice):
+            group_weights[slot][group] += weight
+    marginals = []
+    for slot, groups in enumerate(slot_groups):
+        probabilities = [0.0] * len(slots[slot])
+        if valid_weight:
+            for group, (_, indices) in enumerate(groups):
+                for index in indices:
+                    probabilities[index] = group_weights[slot][group] / len(indices) / valid_weight
+        marginals.append(probabilities)
+    # balls and genders aren't restricted, they just multiply the possibilities
+    unrestricted_count = len(pokeset["ball"]) * len(pokeset["gender"])
+    possible_count = unrestricted_count
+    for options in slots:
+        possible_count *= len(options)
+    valid_count = valid_weight * unrestricted_count
+    return RestrictionAnalysis(
+        valid_count=valid_count,
+        possible_count=possible_count,
+        valid_fraction=valid_count / possible_count,
+        marginals={
+            "item": marginals[0],
+            "ability": marginals[1],
+            "ball": [1 / len(pokeset["ball"])] * len(pokeset["ball"]),
+            "gender": [1 / len(pokeset["gender"])] * len(pokeset["gender"]),
+            "moves": marginals[2:],
+        },
+    )
+
+
 def fix_moves(instance):
     ivs = instance["ivs"]
     for move in instance["moves"]:
@@ -669,61 +890,182 @@ def fix_moves(instance):
             move["displayname"] += " " + judgment_type
 
 
-def instantiate_pokeset(pokeset):
+def instantiate_pokeset(pokeset, rng=None):
     """
     Takes a populated set and solidifies any data that is ought to be decided by RNG.
     This includes randomly picking from lists of genders, abilities, items and/or moves.
     The "Combinations" and "Separations" rules are taken into consideration.
 
+    Arguments:
+        pokeset: the populated set to instantiate.
+        rng: Defaults to None (module-global random). A random.Random, a NumPy Generator
+             or a seed to make the result reproducible and independent of other threads.
     Returns:
         The instantiated set
     """
-    def instantiate(item, key):
-        item[key] = random.choice(item[key])
+    start = perf_counter()
+    rng = get_rng(rng)
     # brute-force valid set by rerolling until it is valid (sorry...)
     attempts = 0x2329  # random high number
-    for _ in range(attempts):
+    for attempt in range(1, attempts + 1):
         instance = deepcopy(pokeset)
-        instantiate(instance, "item")
-        instantiate(instance, "ball")
-        instantiate(instance, "ability")
-        instantiate(instance, "gender")
-        for move_i in range(len(instance["moves"])):
-            instantiate(instance["moves"], move_i)
-        if _check_restrictions(instance):
-            del instance["combinations"]
-            del instance["separations"]
-            fix_moves(instance)
-            return instance
-    log.critical("Was unable to generate instance of set that respects the "
-                 "restrictions after %d attempts. Moveset: %s", attempts, pokeset)
+        if _pick_options(instance, rng):
+            break
+    else:
+        log.critical("Was unable to generate instance of set that respects the "
+                     "restrictions after %d attempts. Moveset: %s", attempts, pokeset)
+        metrics.instantiate_invalid.inc()
+    metrics.instantiate_attempts.observe(attempt)
+    if attempt > 1:
+        metrics.instantiate_rerolls.inc(attempt - 1)
+    instance = _finish_instance(instance)  # invalid instance if no attempt succeeded :(
+    metrics.instantiate_seconds.observe(perf_counter() - start)
+    return instance
+
+
+# result of populate_and_instantiate for one raw set. populated is None and error
+# the ValueError if the set couldn't be populated
+InstantiatedSet = namedtuple("InstantiatedSet", ["index", "populated", "instances", "diagnostics", "error"])
+
+
+def populate_and_instantiate(pokesets, amount=1, seed=None, skip_ev_check=False, generation=None):
+    """
+    Populates raw sets and instantiates each of them `amount` times, all in memory.
+    Works through `pokesets` lazily, so instances can be streamed out as they are made.
+
+    Arguments:
+        pokesets: iterable of raw sets, like the input of `populate_pokeset`.
+        amount: Defaults to 1. How many instances to make of each set.
+        seed: Defaults to None. If supplied, the n-th instance of the set at position i
+              is instantiated with `rng.derive_rng(seed, i, n)`.
+        skip_ev_check, generation: see `populate_pokeset`.
+    Returns:
+        An iterator yielding an InstantiatedSet per raw set, in order. Each has the
+        correctable problems of the set collected in `diagnostics`. Sets which can't be
+        populated have the ValueError as `error` and no instances instead of raising it.
+    """
+    for index, pokeset in enumerate(pokesets):
+        diagnostics = Diagnostics()
+        try:
+            populated = populate_pokeset(pokeset, skip_ev_check, diagnostics, generation)
+        except ValueError as ex:
+            yield InstantiatedSet(index, None, [], diagnostics, ex)
+            continue
+        instances = [instantiate_pokeset(populated, rng=None if seed is None else derive_rng(seed, index, n))
+                     for n in range(amount)]
+        yield InstantiatedSet(index, populated, instances, diagnostics, None)
+
+
+def _pick_options(instance, rng):
+    """Replaces the lists of options of a copy of a populated set with a random pick each.
+    Returns whether the result respects the set's restrictions."""
+    def instantiate(item, key):
+        item[key] = rng.choice(item[key])
+    instantiate(instance, "item")
+    instantiate(instance, "ball")
+    instantiate(instance, "ability")
+    instantiate(instance, "gender")
+    for move_i in range(len(instance["moves"])):
+        instantiate(instance["moves"], move_i)
+    return _check_restrictions(instance)
+
+
+def _finish_instance(instance):
     del instance["combinations"]
     del instance["separations"]
     fix_moves(instance)
-    return instance  # invalid instance though :(
-
-
-def generate_random_pokeset():
-    pokeset = {}
-    pokeset["species"] = random.randint(1, 493)
-    pokeset["setname"] = "Standard"
-    pokeset["ability"] = random.choice(gen4data.ABILITIES)["name"]
-    pokeset["nature"]  = random.choice(gen4data.NATURES)["name"]
-    pokeset["ivs"]     = {stat: random.randint(1, 31) for stat in stats.statnames}
-    pokeset["evs"]     = {stat: random.randint(0, 85//4)*4 for stat in stats.statnames}
-    random_moves       = random.sample(gen4data.MOVES,
-                                       random.choice([4, 4, 4, 4, 4, 3, 2, 1, 1]))
-    pokeset["moves"]   = [m["name"] for m in random_moves]
-    pokeset["shiny"]   = random.random() < 0.2
-    if random.random() < 0.3:
-        pokeset["item"] = random.choice(gen4data.ITEMS)["name"]
-    if random.random() < 0.8:
-        pokeset["gender"] = random.choice(["m", "f"])
-    return populate_pokeset(pokeset)
-
-def generate_random_pokemon():
-    pokeset = generate_random_pokeset()
-    return instantiate_pokeset(pokeset)
+    return instance
+
+
+def _choose_gender(species, rng):
+    ratios = species.get("gender_ratios")
+    if not ratios:
+        return None
+    roll = rng.random()
+    for gender, ratio in ratios.items():
+        roll -= ratio
+        if roll < 0:
+            return gender
+    return gender  # rounding errors
+
+
+def generate_random_pokeset(rng=None, generation=None):
+    """
+    Generates a random populated set, usually for testing.
+    The set is built directly from the data tables instead of being populated from names,
+    which is much faster. Genders respect the species' gender ratios.
+
+    Arguments:
+        rng: Defaults to None. See `rng.get_rng` for what can be supplied.
+        generation: Defaults to None, which is generation 4.
+    """
+    rng = get_rng(rng)
+    gen = get_generation(generation)
+    abilities, holdable_items = _random_choices(gen)
+    species = gen.pokedex[rng.randint(1, 493)]
+    shiny = rng.random() < 0.2
+    item = rng.choice(holdable_items) if rng.random() < 0.3 else gen.get_item(None)
+    moves = []
+    for move in rng.sample(gen.moves, rng.choice([4, 4, 4, 4, 4, 3, 2, 1, 1])):
+        move = dict(move, pp_ups=0)
+        moves.append([move])
+    pokeset = {
+        "species": species,
+        "setname": "Standard",
+        "ability": [dict(rng.choice(abilities))],
+        "nature": dict(rng.choice(gen.natures)),
+        "ivs": {stat: rng.randint(1, 31) for stat in stats.statnames},
+        "evs": {stat: rng.randint(0, 85//4)*4 for stat in stats.statnames},
+        "moves": moves,
+        "shiny": shiny,
+        "item": [dict(item)],
+        "gender": [_choose_gender(species, rng)],
+        "ball": [dict(rng.choice(gen.balls))],
+        "ingamename": species["name"].upper(),
+        "displayname": species["name"],
+        "form": 0,
+        "happiness": 255,
+        "biddable": not shiny,
+        "hidden": shiny,
+        "rarity": 1.0,
+        "level": 100,
+        "combinations": [],
+        "separations": [],
+        "tags": [],
+    }
+    pokeset["species"] = deepcopy(species)
+    apply_pokeset_form_adjustments(pokeset, gen)
+    pokeset["stats"] = {statname: stats.calculate_stat(pokeset["species"]["basestats"][statname],
+                                                       pokeset["evs"][statname], pokeset["ivs"][statname],
+                                                       statname, pokeset["nature"], pokeset["level"])
+                        for statname in stats.statnames}
+    pokeset["curr_hp"] = pokeset["stats"]["hp"]
+    pokeset["status"] = _new_status()
+    _add_generated_tags(pokeset)
+    return pokeset
+
+
+@lru_cache(maxsize=None)
+def _random_choices(gen):
+    """Returns the abilities and holdable items, which excludes balls and unused ids, of a generation."""
+    ball_ids = {ball["id"] for ball in gen.balls}
+    abilities = [ability for ability in gen.abilities if ability and ability["name"]]
+    items = [item for item in gen.items
+             if item and item["name"] and item["id"] not in ball_ids and item["name"] != "unknown"]
+    return abilities, items
+
+
+metrics.caches.add("random_choices", _random_choices)
+metrics.caches.add("move_name_id", objects._move_name_id)
+
+
+def generate_random_pokemon(rng=None, generation=None):
+    """Generates a random instantiated Pokémon, usually for testing. See `generate_random_pokeset`."""
+    rng = get_rng(rng)
+    pokeset = generate_random_pokeset(rng, generation)
+    # freshly generated and without restrictions, so no copy or rerolls needed
+    _pick_options(pokeset, rng)
+    return _finish_instance(pokeset)
 
 
 def recalculate_pokeset_stats(pokeset):
@@ -743,6 +1085,10 @@ def recalculate_pokeset_stats(pokeset):
 
 
 def redact_pokeset_data(pokeset):
+    """
+    Redacts all data of an instantiated Pokémon that could identify it, in place.
+    See `redacted_view` and `dumps_redacted` for doing so without copying or modifying it.
+    """
     pokeset['displayname'] = '???'
     pokeset['ingamename'] = '???'
     pokeset['setname'] = '???'
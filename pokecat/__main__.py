@@ -1,82 +1,184 @@
 """
 Usage:
-  pokecat populate <inputfile> <outputfile>
-  pokecat instantiate <inputfile> <outputfile>
-  pokecat genpokesets <outputfile> [<amount>]
-  pokecat genpokemon <outputfile> [<amount>]
+  pokecat populate <inputfile> <outputfile> [--profile] [--normalized] [--from=<format>] [--to=<format>]
+  pokecat populatepool <inputdir> <outputfile> [--processes=<n>] [--normalized] [--to=<format>]
+  pokecat lint <inputfiles>... [--from=<format>]
+  pokecat instantiate <inputfile> <outputfile> [--seed=<seed>] [--from=<format>] [--to=<format>]
+  pokecat populateinstantiate <inputfile> <outputfile> [--instances=<k>] [--seed=<seed>] [--populated=<file>] [--from=<format>] [--to=<format>]
+  pokecat genpokesets <outputfile> [<amount>] [--seed=<seed>] [--processes=<n>] [--to=<format>]
+  pokecat genpokemon <outputfile> [<amount>] [--seed=<seed>] [--processes=<n>] [--to=<format>]
+  pokecat compile <inputfile> <outputfile> [--from=<format>]
+  pokecat neardupes <inputfile> [--threshold=<t>] [--from=<format>]
+  pokecat membench
 
 Options:
-  -h --help     Show this screen.
-  --version     Show version.
+  -h --help        Show this screen.
+  --version        Show version.
+  --profile        Print how much time was spent in each stage of populating, and the slowest sets.
+  --normalized     Write the populated sets as one normalized pool, which stores each species, move,
+                   item, ability, ball and nature only once. pokecat reads it like a list of sets.
+  --processes=<n>  Number of processes to populate files or generate with. Defaults to one per CPU.
+  --threshold=<t>  Minimum similarity from 0 to 1 of sets to be reported as near-duplicates [default: 0.8].
+  --instances=<k>  Number of instances to make of each set [default: 1].
+  --populated=<file>  Also write the populated sets to this file, in a format chosen like --to.
+  --seed=<seed>    Make the random choices reproducible. Each set or Pokémon gets its own RNG
+                   derived from the seed and its position, so the output doesn't depend on the order of work.
+  --from=<format>  Format of the input files, one of yaml, json and jsonl, optionally compressed
+                   with .gz or .zst, e.g. jsonl.gz. Defaults to the file extension, or else yaml.
+  --to=<format>    Format of the output file, like --from. Defaults to the file extension,
+                   or else JSON for instantiated and YAML for populated sets.
 """
 
-import json
 import os
-import warnings
+import sys
+from contextlib import nullcontext
 
-import yaml
 from docopt import docopt
 
 from . import (populate_pokeset,
+               populate_and_instantiate,
+               validate_pokeset,
+               Diagnostics,
                instantiate_pokeset,
-               generate_random_pokeset,
-               generate_random_pokemon)
+               profiling)
+from .corpus import generate_corpus, write_corpus_jsonl
+from .rng import derive_rng
+from .poolstore import compile_pool
+from .pool import load_pool
+from .similarity import find_near_duplicates
+from .fileio import load_documents, dump_documents, detect_format, open_file
+from .normalized import normalize_pool
+from . import memory
 
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 __version__ = open(os.path.join(ROOT_DIR, 'VERSION')).read().strip()
 
+def _rng_for(args, index):
+    seed = args.get("--seed")
+    if seed is None:
+        return None
+    return derive_rng(seed, index)
+
+def _dump_populated(args, pokesets):
+    if args.get("--normalized"):
+        pokesets = [normalize_pool(pokesets)]
+    dump_documents(pokesets, args["<outputfile>"], args["--to"])
+
 def main():
     args = docopt(__doc__, version=__version__)
     if args.get("populate"):
-        indata = list(yaml.load_all(open(args["<inputfile>"], encoding="utf-8")))
+        profiler = profiling.Profiler() if args.get("--profile") else None
+        with profiler.stage("cli: load") if profiler else nullcontext():
+            indata = load_documents(args["<inputfile>"], args["--from"])
         outdata = []
-        for data in indata:
-            if not data:
-                continue
-            identifier = "{set[species]} {set[setname]}".format(set=data)
-            try:
-                with warnings.catch_warnings(record=True) as w:
-                    data = populate_pokeset(data)
-                    for warning in w:
-                        print("{}> {}".format(identifier, warning.message))
-            except ValueError as ex:
-                print("{}> ERROR: {}".format(identifier, ex))
+        with profiler.activate() if profiler else nullcontext():
+            for data in indata:
+                if not data:
+                    continue
+                identifier = "{set[species]} {set[setname]}".format(set=data)
+                diagnostics = Diagnostics()
+                try:
+                    data = populate_pokeset(data, diagnostics=diagnostics)
+                    for diagnostic in diagnostics:
+                        print("{}> {}".format(identifier, diagnostic.message))
+                except ValueError as ex:
+                    print("{}> ERROR: {}".format(identifier, ex))
+                else:
+                    outdata.append(data)
+        with profiler.stage("cli: dump") if profiler else nullcontext():
+            _dump_populated(args, outdata)
+        if profiler:
+            print(profiler.report())
+    elif args.get("populatepool"):
+        processes = args.get("--processes")
+        pool = load_pool(args["<inputdir>"], processes=int(processes) if processes else None)
+        for warning in pool.warnings:
+            print("{0.filename}[{0.index}] {1}> {2}".format(warning.source, warning.identifier, warning.message))
+        for error in pool.errors:
+            if error.source.index is None:
+                print("{0.filename}> ERROR: {1}".format(error.source, error.message))
             else:
-                outdata.append(data)
-        yaml.safe_dump_all(
-            outdata,
-            open(args["<outputfile>"], "w+", encoding="utf-8"),
-            indent=4,
-        )
+                print("{0.filename}[{0.index}] {1}> ERROR: {2}".format(error.source, error.identifier, error.message))
+        for duplicate in pool.duplicates:
+            print("{0.filename}[{0.index}]> ERROR: Duplicate set {1[0]} {1[1]}, first defined in {2.filename}[{2.index}]"
+                  .format(duplicate.duplicate, duplicate.set_id, duplicate.first))
+        _dump_populated(args, [entry.pokeset for entry in pool.entries])
+    elif args.get("lint"):
+        errors = 0
+        for inputfile in args["<inputfiles>"]:
+            for data in load_documents(inputfile, args["--from"]):
+                if not data:
+                    continue
+                if not isinstance(data, dict):
+                    errors += 1
+                    print("{}> ERROR: document is not a mapping".format(inputfile))
+                    continue
+                identifier = "{}: {} {}".format(inputfile, data.get("species"), data.get("setname"))
+                diagnostics = Diagnostics()
+                try:
+                    validate_pokeset(data, diagnostics=diagnostics)
+                except ValueError as ex:
+                    errors += 1
+                    print("{}> ERROR: {}".format(identifier, ex))
+                for diagnostic in diagnostics:
+                    print("{}> {}".format(identifier, diagnostic.message))
+        if errors:
+            sys.exit(1)
     elif args.get("instantiate"):
-        indata = list(yaml.load_all(open(args["<inputfile>"], encoding="utf-8")))
-        outdata = []
-        for data in indata:
-            identifier = "{set[species]} {set[setname]}".format(set=data)
-            data = instantiate_pokeset(data)
-            outdata.append(data)
-        json.dump(
-            outdata,
-            open(args["<outputfile>"], "w+", encoding="utf-8"),
-            indent=4,
-        )
-    elif args.get("genpokesets"):
-        num = int(args.get("<amount>") or 1)
-        pokesets = [generate_random_pokeset() for _ in range(num)]
-        yaml.dump(
-            pokesets,
-            open(args["<outputfile>"], "w+", encoding="utf-8"),
-            indent=4,
-        )
-    elif args.get("genpokemon"):
+        indata = load_documents(args["<inputfile>"], args["--from"])
+        outdata = (instantiate_pokeset(data, rng=_rng_for(args, index)) for index, data in enumerate(indata))
+        dump_documents(outdata, args["<outputfile>"], args["--to"], default="json")
+    elif args.get("populateinstantiate"):
+        populated = [] if args["--populated"] else None
+
+        def instances():
+            indata = [data for data in load_documents(args["<inputfile>"], args["--from"]) if data]
+            for result in populate_and_instantiate(indata, amount=int(args["--instances"]), seed=args["--seed"]):
+                data = indata[result.index]
+                identifier = "{} {}".format(data.get("species"), data.get("setname"))
+                for diagnostic in result.diagnostics:
+                    print("{}> {}".format(identifier, diagnostic.message))
+                if result.error is not None:
+                    print("{}> ERROR: {}".format(identifier, result.error))
+                    continue
+                if populated is not None:
+                    populated.append(result.populated)
+                yield from result.instances
+        # instances are written while they are made, without serializing the populated sets
+        dump_documents(instances(), args["<outputfile>"], args["--to"], default="json")
+        if populated is not None:
+            dump_documents(populated, args["--populated"])
+    elif args.get("genpokesets") or args.get("genpokemon"):
+        kind = "pokesets" if args.get("genpokesets") else "pokemon"
         num = int(args.get("<amount>") or 1)
-        pokemon = [generate_random_pokemon() for _ in range(num)]
-        json.dump(
-            pokemon,
-            open(args["<outputfile>"], "w+", encoding="utf-8"),
-            indent=4,
-        )
+        seed = args.get("--seed")
+        processes = int(args["--processes"]) if args.get("--processes") else None
+        outputfile = args["<outputfile>"]
+        default = "yaml" if kind == "pokesets" else "json"
+        fmt, compression = detect_format(outputfile, args["--to"], default)
+        if fmt == "jsonl":
+            # encoded by the worker processes and streamed, so the corpus doesn't have to fit into memory
+            with open_file(outputfile, "w", compression) as f:
+                write_corpus_jsonl(f, kind, num, seed=seed, processes=processes)
+        else:
+            dump_documents(generate_corpus(kind, num, seed=seed, processes=processes),
+                           outputfile, args["--to"], default=default)
+    elif args.get("compile"):
+        count = compile_pool(load_documents(args["<inputfile>"], args["--from"]), args["<outputfile>"])
+        print("Compiled {} sets".format(count))
+    elif args.get("neardupes"):
+        indata = load_documents(args["<inputfile>"], args["--from"])
+        for cluster in find_near_duplicates(indata, threshold=float(args["--threshold"])):
+            print("Near-duplicates:")
+            for index1, index2, similarity in cluster.pairs:
+                print("  {0[species][name]} {0[setname]} ~ {1[species][name]} {1[setname]} ({2:.0%})"
+                      .format(indata[index1], indata[index2], similarity))
+    elif args.get("membench"):
+        usages = memory.run_benchmark()
+        print(memory.report(usages))
+        if any(memory.per_object(usage) > memory.BUDGETS.get(usage.name, float("inf")) for usage in usages):
+            sys.exit(1)
 
 
 main()
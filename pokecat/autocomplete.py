@@ -0,0 +1,80 @@
+
+import re
+from bisect import bisect_left
+from heapq import nsmallest
+
+from unidecode import unidecode
+
+
+# maps table names to the kinds of things users know them by
+KINDS = {
+    "species":   "pokedex",
+    "moves":     "moves",
+    "items":     "items",
+    "abilities": "abilities",
+    "natures":   "natures",
+    "balls":     "balls",
+}
+
+
+def completion_key(name):
+    """Normalizes a name or typed prefix into a lookup key, e.g. "Thunder W" into "thunderw"."""
+    return re.sub(r"[^a-z0-9]", "", unidecode(name).lower())
+
+
+class PrefixIndex:
+    """
+    Sorted array of normalized names for completing typed prefixes to names.
+    Names are matched from their start, or else from the start of any later word
+    (so "wave" completes to "Thunder Wave"), the former being ranked higher.
+    Within a rank, shorter names come first.
+    """
+
+    def __init__(self, entries, namegetter, normalize=None):
+        keyed = []
+        for item in entries:
+            if not item or not item["name"]:
+                continue  # null item, for lists having nothing as id 0 for example
+            name = namegetter(item)
+            full = completion_key(normalize(name) if normalize else name)
+            keyed.append((full, 0, len(full), name))
+            words = re.split(r"[\s-]+", name)
+            for i in range(1, len(words)):
+                keyed.append((completion_key(" ".join(words[i:])), 1, len(full), name))
+        keyed.sort()
+        self._keys = [k[0] for k in keyed]
+        self._entries = [k[1:] for k in keyed]
+
+    def complete(self, prefix, limit=10):
+        """Returns up to `limit` names starting with `prefix`, best matches first."""
+        key = completion_key(prefix)
+        start = bisect_left(self._keys, key)
+        end = bisect_left(self._keys, key + "\x7f", lo=start)
+        # a name might match fully and by multiple words, keep its best match
+        best = {}
+        for entry in self._entries[start:end]:
+            previous = best.get(entry[2])
+            if previous is None or entry < previous:
+                best[entry[2]] = entry
+        return [entry[2] for entry in nsmallest(limit, best.values())]
+
+
+def complete(kind, prefix, limit=10, generation=None):
+    """
+    Completes a typed prefix to the names of species, moves, items, abilities, natures or balls.
+
+    Arguments:
+        kind: one of "species", "moves", "items", "abilities", "natures" and "balls".
+        prefix: what was typed so far. Case, spaces and punctuation are ignored.
+        limit: Defaults to 10. Maximum number of results.
+        generation: Defaults to None, which is generation 4.
+    Returns:
+        A list of matching names, best matches first.
+        They are accepted as-is by populate_pokeset, e.g. "Master" for the Master Ball.
+    """
+    from .generations import get_generation
+    try:
+        table = KINDS[kind]
+    except KeyError:
+        raise ValueError("Cannot complete %s, must be one of: %s" % (kind, ", ".join(KINDS)))
+    return get_generation(generation).complete(table, prefix, limit)
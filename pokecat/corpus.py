@@ -0,0 +1,88 @@
+"""
+Generating large amounts of random sets or Pokémon, e.g. as a corpus for load tests.
+Work is split into shards which are generated in parallel processes,
+while the results are streamed in order with a bounded number of shards in flight.
+"""
+
+import json
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from . import generate_random_pokeset, generate_random_pokemon
+from .rng import derive_rng
+
+
+GENERATORS = {
+    "pokesets": generate_random_pokeset,
+    "pokemon": generate_random_pokemon,
+}
+
+
+def _rngs(start, stop, seed):
+    if seed is None:
+        # seeded from the OS, so every shard differs
+        rng = random.Random()
+        return (rng for _ in range(start, stop))
+    # one RNG per index, so the output doesn't depend on the sharding
+    return (derive_rng(seed, index) for index in range(start, stop))
+
+
+def _generate_shard(kind, start, stop, seed, encode):
+    generate = GENERATORS[kind]
+    results = [generate(rng) for rng in _rngs(start, stop, seed)]
+    if encode:
+        return "".join(json.dumps(result) + "\n" for result in results)
+    return results
+
+
+def _shards(kind, amount, seed, processes, shard_size, encode):
+    bounds = [(start, min(start + shard_size, amount)) for start in range(0, amount, shard_size)]
+    if processes == 1 or len(bounds) <= 1:
+        for start, stop in bounds:
+            yield _generate_shard(kind, start, stop, seed, encode)
+        return
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        in_flight = deque()
+        max_in_flight = 2 * processes
+        for start, stop in bounds:
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+            in_flight.append(executor.submit(_generate_shard, kind, start, stop, seed, encode))
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def generate_corpus(kind, amount, seed=None, processes=None, shard_size=1000):
+    """
+    Generates random populated sets or instantiated Pokémon in parallel.
+
+    Arguments:
+        kind: "pokesets" or "pokemon".
+        amount: how many to generate.
+        seed: Defaults to None. If supplied, the n-th result is the same as
+              `generate_random_pokeset(rng=derive_rng(seed, n))` (or `generate_random_pokemon`),
+              regardless of the number of processes or the shard size.
+        processes: Defaults to None, which uses one process per CPU.
+                   1 generates everything in the current process.
+        shard_size: Defaults to 1000. How many results each unit of work generates.
+    Returns:
+        An iterator yielding the results in order.
+    """
+    if kind not in GENERATORS:
+        raise ValueError("Cannot generate %s, must be one of: %s" % (kind, ", ".join(GENERATORS)))
+    for shard in _shards(kind, amount, seed, processes, shard_size, encode=False):
+        yield from shard
+
+
+def write_corpus_jsonl(outfile, kind, amount, seed=None, processes=None, shard_size=1000):
+    """
+    Like `generate_corpus`, but writes the results to a text file object as JSON Lines,
+    one result per line. The JSON encoding happens in the worker processes as well.
+    """
+    if kind not in GENERATORS:
+        raise ValueError("Cannot generate %s, must be one of: %s" % (kind, ", ".join(GENERATORS)))
+    for shard in _shards(kind, amount, seed, processes, shard_size, encode=True):
+        outfile.write(shard)
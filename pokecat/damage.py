@@ -0,0 +1,135 @@
+"""
+Vectorized damage calculation for all pairs of instantiated Pokémon in a pool,
+e.g. for balancing analysis. Requires numpy.
+
+Uses the gen 4 damage formula with STAB, type effectiveness and the random
+factor (85-100%), but without critical hits, abilities, items, weather or
+other field effects. Moves with variable or fixed damage, which have a power
+of 0 in the data, are treated as dealing no damage.
+"""
+
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from .globaldata import TYPES
+from . import typechart
+
+
+# index for "no type", e.g. a missing second type or "???". Always neutral.
+_NO_TYPE = len(TYPES)
+
+DamageMatrix = namedtuple("DamageMatrix", ["minimum", "maximum", "move_mask"])
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("pokecat's damage calculation requires numpy to be installed")
+
+
+def _type_index(type_):
+    return typechart.TYPE_NUMBERS.get(type_, _NO_TYPE)
+
+
+def effectiveness_array():
+    """
+    Returns a float array of shape (len(TYPES)+1, len(TYPES)+1) with the multiplier
+    of an attacking type (first axis) against a defending type (second axis),
+    in the order of globaldata.TYPES. The last index stands for no type.
+    """
+    _require_numpy()
+    return np.pad(typechart.effectiveness_array(), (0, 1), constant_values=1.0)
+
+
+def _pool_arrays(pokemons):
+    n = len(pokemons)
+    arrays = {
+        "level":    np.zeros(n, dtype=np.int64),
+        "hp":       np.ones(n, dtype=np.int64),
+        "atk":      np.zeros(n, dtype=np.int64),
+        "def":      np.ones(n, dtype=np.int64),
+        "spA":      np.zeros(n, dtype=np.int64),
+        "spD":      np.ones(n, dtype=np.int64),
+        "types":    np.full((n, 2), _NO_TYPE, dtype=np.int64),
+        "power":    np.zeros((n, 4), dtype=np.int64),
+        "movetype": np.full((n, 4), _NO_TYPE, dtype=np.int64),
+        "physical": np.zeros((n, 4), dtype=bool),
+        "damaging": np.zeros((n, 4), dtype=bool),
+        "mask":     np.zeros((n, 4), dtype=bool),
+    }
+    for i, pokemon in enumerate(pokemons):
+        arrays["level"][i] = pokemon["level"]
+        for stat in ("hp", "atk", "def", "spA", "spD"):
+            arrays[stat][i] = pokemon["stats"][stat]
+        for t, type_ in enumerate(pokemon["species"]["types"][:2]):
+            arrays["types"][i, t] = _type_index(type_)
+        for m, move in enumerate(pokemon["moves"][:4]):
+            arrays["mask"][i, m] = True
+            arrays["power"][i, m] = move["power"] or 0
+            arrays["movetype"][i, m] = _type_index(move["type"])
+            arrays["physical"][i, m] = move["category"] == "Physical"
+            arrays["damaging"][i, m] = move["category"] != "Status" and bool(move["power"])
+    return arrays
+
+
+def damage_matrix(pokemons, chunk_size=256):
+    """
+    Calculates the damage range of every move of every Pokémon against every Pokémon.
+
+    Arguments:
+        pokemons: list of instantiated Pokémon.
+        chunk_size: Defaults to 256. How many attackers get calculated at once.
+                    Bounds the memory used for intermediate arrays.
+    Returns:
+        A DamageMatrix with float32 arrays `minimum` and `maximum` of shape
+        (attackers, 4, defenders), containing the damage in percent of the
+        defender's max HP, and a bool array `move_mask` of shape (attackers, 4)
+        telling which move slots exist. Missing move slots deal no damage.
+    """
+    _require_numpy()
+    n = len(pokemons)
+    pool = _pool_arrays(pokemons)
+    effectiveness = effectiveness_array()
+    minimum = np.zeros((n, 4, n), dtype=np.float32)
+    maximum = np.zeros((n, 4, n), dtype=np.float32)
+    level_factor = 2 * pool["level"] // 5 + 2
+    attack = np.where(pool["physical"], pool["atk"][:, None], pool["spA"][:, None])
+    stab = ((pool["movetype"][:, :, None] == pool["types"][:, None, :]).any(axis=2)
+            & (pool["movetype"] != _NO_TYPE))
+    hp = pool["hp"][None, None, :].astype(np.float64)
+    for start in range(0, n, chunk_size):
+        a = slice(start, min(start + chunk_size, n))
+        physical = pool["physical"][a, :, None]
+        defense = np.where(physical, pool["def"][None, None, :], pool["spD"][None, None, :])
+        numerator = (level_factor[a, None, None] * pool["power"][a, :, None] * attack[a, :, None]) // 50
+        base = numerator // defense + 2
+        movetype = pool["movetype"][a, :, None]
+        type1 = effectiveness[movetype, pool["types"][None, None, :, 0]]
+        type2 = effectiveness[movetype, pool["types"][None, None, :, 1]]
+        damaging = pool["damaging"][a, :, None]
+        hits = damaging & (type1 * type2 > 0)
+        for random_factor, out in ((85, minimum), (100, maximum)):
+            damage = base * random_factor // 100
+            damage = np.where(stab[a, :, None], damage * 3 // 2, damage)
+            damage = np.floor(damage * type1)
+            damage = np.floor(damage * type2)
+            damage = np.where(hits, np.maximum(damage, 1), 0)
+            out[a] = damage / hp * 100
+    return DamageMatrix(minimum=minimum, maximum=maximum, move_mask=pool["mask"])
+
+
+def balance_scores(pokemons, chunk_size=256):
+    """
+    Summarizes the damage matrix of a pool into one offensive and one defensive score
+    per Pokémon: the average max damage in percent its best move deals to the pool,
+    and the average max damage in percent the pool's best moves deal to it.
+
+    Returns:
+        A tuple (offense, defense) of float arrays with one entry per Pokémon.
+    """
+    matrix = damage_matrix(pokemons, chunk_size)
+    best = matrix.maximum.max(axis=1)  # (attackers, defenders)
+    return best.mean(axis=1), best.mean(axis=0)
@@ -0,0 +1,39 @@
+from collections import namedtuple
+from enum import Enum
+from warnings import warn
+
+
+class DiagnosticCode(Enum):
+    LOWERCASE_KEY         = "lowercase-key"
+    AUTOCORRECTED         = "autocorrected"
+    INVALID_EVS           = "invalid-evs"
+    WASTED_EVS            = "wasted-evs"
+    DUPLICATE_MOVES       = "duplicate-moves"
+    HIGH_RARITY           = "high-rarity"
+    HIDDEN_BIDDABLE       = "hidden-biddable"
+    PUBLIC_SHINY          = "public-shiny"
+    UNLIKELY_RESTRICTIONS = "unlikely-restrictions"
+
+
+Diagnostic = namedtuple("Diagnostic", ["code", "message", "fields"])
+
+
+class Diagnostics(list):
+    """
+    Collects the notices populate_pokeset would otherwise emit as warnings.
+    Each entry is a Diagnostic with a DiagnosticCode, the human readable message
+    and a dict of fields with the relevant data, e.g. the misspelled and assumed
+    name for autocorrections. Pass one instance per set to keep things thread-safe.
+    """
+
+    def report(self, code, message, **fields):
+        self.append(Diagnostic(code, message, fields))
+
+    def with_code(self, code):
+        return [d for d in self if d.code == code]
+
+
+def warn_diagnostic(code, message, **fields):
+    """Default reporter, emits the message as a UserWarning like pokecat always did."""
+    # stacklevel 2 attributes the warning to the function reporting it
+    warn(message, stacklevel=2)
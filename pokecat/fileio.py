@@ -0,0 +1,141 @@
+"""
+Reading and writing documents, i.e. sets or Pokémon, as YAML, JSON or JSON Lines,
+optionally compressed with gzip or zstd.
+
+The format is chosen by the file extension, e.g. "pool.jsonl.gz",
+or explicitly by a format string in the same notation, e.g. "jsonl.gz".
+All formats have the same semantics: a file is a sequence of documents.
+YAML files have one document per YAML document, JSON Lines files one per line,
+and JSON files are a list of documents. A YAML or JSON document which is a list
+is read as multiple documents, so YAML files containing one list work as well.
+A normalized pool (see `normalized`) is read as the sets it contains.
+
+YAML is parsed and emitted with libyaml's C implementation if available.
+zstd compression requires the zstandard package.
+"""
+
+import gzip
+import json
+import os
+
+import yaml
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+from .normalized import is_normalized_pool, expand_pool
+
+
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+FORMATS = ("yaml", "json", "jsonl")
+_EXTENSIONS = {
+    "yaml": "yaml",
+    "yml": "yaml",
+    "json": "json",
+    "jsonl": "jsonl",
+    "ndjson": "jsonl",
+}
+_COMPRESSIONS = {
+    "gz": "gzip",
+    "gzip": "gzip",
+    "zst": "zstd",
+    "zstd": "zstd",
+}
+
+
+def detect_format(filename, fmt=None, default="yaml"):
+    """
+    Returns the (format, compression) of a file, e.g. ("jsonl", "gzip") for "pool.jsonl.gz".
+    `fmt` overrides the extension and uses the same notation, e.g. "jsonl.gz" or "yaml".
+    Without a recognized format, `default` is used. Compression is None for uncompressed files.
+    """
+    parts = (fmt if fmt is not None else os.path.basename(filename)).lower().split(".")
+    compression = None
+    if len(parts) > 1 and parts[-1] in _COMPRESSIONS:
+        compression = _COMPRESSIONS[parts.pop()]
+    if parts[-1] in _EXTENSIONS:
+        return _EXTENSIONS[parts[-1]], compression
+    if fmt is not None:
+        raise ValueError("Unknown format %s, must be one of %s, optionally followed by .gz or .zst"
+                         % (fmt, ", ".join(FORMATS)))
+    return default, compression
+
+
+def open_file(filename, mode="r", compression=None):
+    """Opens a file in text mode with utf-8 encoding, (de)compressing it with gzip or zstd."""
+    if compression is None:
+        return open(filename, mode, encoding="utf-8")
+    if compression == "gzip":
+        return gzip.open(filename, mode + "t", encoding="utf-8")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("pokecat requires the zstandard package to be installed for zstd compression")
+        return zstandard.open(filename, mode + "t", encoding="utf-8")
+    raise ValueError("Unknown compression: %s" % compression)
+
+
+def _expand_normalized(documents):
+    for document in documents:
+        if is_normalized_pool(document):
+            yield from expand_pool(document)
+        else:
+            yield document
+
+
+def _expand(documents):
+    for document in documents:
+        if isinstance(document, list):
+            yield from _expand_normalized(document)
+        else:
+            yield from _expand_normalized([document])
+
+
+def load_documents(filename, fmt=None, default="yaml"):
+    """
+    Reads all documents of a file. See the module description for the formats.
+    Empty YAML documents and blank JSON Lines are skipped.
+
+    Arguments:
+        filename: the file to read.
+        fmt: Defaults to None, which detects the format by the file extension.
+        default: Defaults to "yaml". Format of files with an unknown extension.
+    Returns:
+        A list of documents.
+    """
+    fmt, compression = detect_format(filename, fmt, default)
+    with open_file(filename, "r", compression) as f:
+        if fmt == "yaml":
+            documents = [d for d in yaml.load_all(f, Loader=YamlLoader) if d is not None]
+        elif fmt == "json":
+            documents = [json.load(f)]
+        else:
+            documents = [json.loads(line) for line in f if line.strip()]
+    return list(_expand(documents))
+
+
+def dump_documents(documents, filename, fmt=None, default="yaml"):
+    """
+    Writes documents to a file. See the module description for the formats.
+    JSON Lines and YAML are written while iterating `documents`,
+    so a generator can be streamed into a file without keeping everything in memory.
+
+    Arguments:
+        documents: iterable of documents to write.
+        filename: the file to write.
+        fmt: Defaults to None, which detects the format by the file extension.
+        default: Defaults to "yaml". Format of files with an unknown extension.
+    """
+    fmt, compression = detect_format(filename, fmt, default)
+    with open_file(filename, "w", compression) as f:
+        if fmt == "yaml":
+            yaml.dump_all(documents, f, Dumper=YamlDumper, indent=4)
+        elif fmt == "json":
+            json.dump(list(documents), f, indent=4)
+        else:
+            for document in documents:
+                f.write(json.dumps(document))
+                f.write("\n")
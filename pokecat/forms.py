@@ -1,4 +1,9 @@
 
+from collections import namedtuple
+
+from .globaldata import DEOXYS_BASESTATS, WORMADAM_BASESTATS
+
+
 unowns = "ABCDEFGHIJKLMNOPQRSTUVWXYZ!?"
 burmy_wormadam = ["Plant", "Sandy", "Trash"]
 deoxys = ["Normal", "Attack", "Defense", "Speed"]
@@ -45,25 +50,101 @@ multitype_colors = {
     "Pixie Plate" : "Pink",
 }
 
+# species id -> names of its forms, by form number
+formnames = {
+    201: unowns,
+    386: deoxys,
+    412: burmy_wormadam,
+    413: burmy_wormadam,
+    422: shellos_gastrodon,
+    423: shellos_gastrodon,
+}
+
+# What a form changes about its species. None keeps the species' value.
+Form = namedtuple("Form", ["basestats", "types", "color"])
+Form.__new__.__defaults__ = (None, None, None)
+NO_CHANGES = Form()
+
+# species id -> formname -> Form. Forms not listed only change the displayname.
+species_forms = {
+    386: {name: Form(basestats=DEOXYS_BASESTATS[name]) for name in deoxys},
+    412: {
+        "Plant": Form(color="Green"),
+        "Sandy": Form(color="Brown"),
+        "Trash": Form(color="Pink"),
+    },
+    413: {
+        "Plant": Form(WORMADAM_BASESTATS["Plant"], ["Bug", "Grass"], "Green"),
+        "Sandy": Form(WORMADAM_BASESTATS["Sandy"], ["Bug", "Ground"], "Brown"),
+        "Trash": Form(WORMADAM_BASESTATS["Trash"], ["Bug", "Steel"], "Pink"),
+    },
+    422: {
+        "West": Form(color="Pink"),
+        "East": Form(color="Blue"),
+    },
+    423: {
+        "West": Form(color="Pink"),
+        "East": Form(color="Blue"),
+    },
+}
+
+# species id -> held item name -> (formname, Form), for species whose form depends on their
+# held item instead of the form number. The None entry is for all other items.
+item_forms = {
+    # Arceus, whose type changes with the plate it holds
+    493: {plate: (type_, Form(types=[type_], color=multitype_colors[plate]))
+          for plate, type_ in multitype_plates.items()},
+}
+
+
 def get_multitype_type(plate):
     return multitype_plates.get(plate["name"], "Normal")
 
 def get_multitype_color(plate):
-    return multitype_plates.get(plate["name"], "White")
+    return multitype_colors.get(plate["name"], "White")
 
 def get_formname(species, form):
+    names = formnames.get(species)
+    if names is None:
+        return None
     try:
-        if species == 386: return deoxys[form]
-        if species == 201: return unowns[form]
-        if species in (412, 413): return burmy_wormadam[form]
-        if species in (422, 423): return shellos_gastrodon[form]
+        return names[form]
     except IndexError:
-        pass
+        return None
 
 def get_formnumber(species, formname):
-    formname = formname.title()
-    if species == 386: return deoxys.index(formname)
-    if species == 201: return unowns.index(formname)
-    if species in (412, 413): return burmy_wormadam.index(formname)
-    if species in (422, 423): return shellos_gastrodon.index(formname)
+    names = formnames.get(species)
+    if names is None:
+        return None
+    return names.index(formname.title())
+
+def has_item_forms(species):
+    return species in item_forms
+
+def get_form(species, form, item=None):
+    """
+    Returns the (formname, Form) of a species' form, or (None, NO_CHANGES) if it has none.
+    For species with item forms, the held item's name decides the form instead of the form number.
+    """
+    if species in item_forms:
+        by_item = item_forms[species]
+        return by_item.get(item, by_item[None])
+    formname = get_formname(species, form)
+    if formname is None:
+        return None, NO_CHANGES
+    return formname, species_forms.get(species, {}).get(formname, NO_CHANGES)
+
+def adjust_species(species, form, item=None):
+    """
+    Returns the (species, formname) for a species' data table entry adjusted to a form.
+    The returned species is a new dict if the form changes anything, else the entry itself.
+    """
+    formname, changes = get_form(species["id"], form, item)
+    if changes is NO_CHANGES:
+        return species, formname
+    adjusted = dict(species)
+    for field, value in zip(Form._fields, changes):
+        if value is not None:
+            adjusted[field] = value
+    return adjusted, formname
 
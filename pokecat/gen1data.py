@@ -1,20 +1,24 @@
 
-from functools import partial
-from os import path
-
-from .datautils import load_from_json_list, build_from_json_dict, get_exact, find_similar
+from .generations import get_generation
 
 from .globaldata import *  # forward
 
 
-ROOT_DIR = path.dirname(path.abspath(__file__))
+GENERATION = get_generation(1)
 
-ITEMS = list(build_from_json_dict(path.join(ROOT_DIR, "gen1data/items.json")))
-MOVES = load_from_json_list(path.join(ROOT_DIR, "gen1data/moves.json"))
-# TODO POKEDEX
+# the tables only get loaded when first accessed
+_TABLES = {
+    "ITEMS": "items",
+    "MOVES": "moves",
+    # TODO POKEDEX
+}
+def __getattr__(name):
+    if name in _TABLES:
+        return GENERATION.table(_TABLES[name])
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
-get_item = partial(get_exact, ITEMS)
-get_move = partial(get_exact, MOVES)
+get_item = GENERATION.get_item
+get_move = GENERATION.get_move
 
-find_item = partial(find_similar, ITEMS)
-find_move = partial(find_similar, MOVES)
+find_item = GENERATION.find_item
+find_move = GENERATION.find_move
@@ -0,0 +1,255 @@
+
+import threading
+from functools import partialmethod
+from operator import itemgetter
+from os import path
+
+from .autocomplete import PrefixIndex
+from .datautils import build_from_json_dict, build_from_json_list, load_from_json_list, find_similar
+from .utils import normalize_name
+from . import globaldata, metrics, forms
+
+
+ROOT_DIR = path.dirname(path.abspath(__file__))
+
+DEFAULT_GENERATION = 4
+
+
+class Table:
+    """
+    Describes one data table of a generation.
+
+    Arguments:
+        loader: function returning the table's list of entries.
+        namegetter: function returning the name an entry is looked up by.
+        normalize: function applied to both the searched name and the entry names
+                   when finding similar names, e.g. normalize_name for Pokémon.
+    """
+    def __init__(self, loader, namegetter=itemgetter("name"), normalize=None):
+        self.loader = loader
+        self.namegetter = namegetter
+        self.normalize = normalize
+
+
+class Generation:
+    """
+    Owns the data tables of one generation, as well as the indexes and
+    fuzzy matchers for looking things up in them. Each table gets loaded
+    and indexed on first use, so unused generations cost nothing.
+    Use `get_generation()` to get the registered generations.
+    """
+
+    def __init__(self, number, tables):
+        self.number = number
+        self._tables = tables
+        self._loaded = {}
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "Generation(%d)" % self.number
+
+    def has_table(self, name):
+        return name in self._tables
+
+    def table_names(self):
+        """Returns the names of all tables of this generation, loaded or not."""
+        return list(self._tables)
+
+    def fresh(self):
+        """Returns a new Generation with the same tables, none of them loaded or indexed yet."""
+        return Generation(self.number, self._tables)
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def table(self, name):
+        """Returns the list of entries of a table, loading it if necessary."""
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+        if name not in self._tables:
+            raise ValueError("Generation %d has no %s data" % (self.number, name))
+        with self._lock:
+            if name not in self._loaded:
+                self._loaded[name] = self._tables[name].loader()
+        return self._loaded[name]
+
+    def _index(self, name):
+        try:
+            return self._indexes[name]
+        except KeyError:
+            pass
+        namegetter = self._tables[name].namegetter
+        by_id, by_name = {}, {}
+        for item in self.table(name):
+            if not item:
+                continue  # null item, for lists having nothing as id 0 for example
+            # first come first serve, like a linear search would
+            by_id.setdefault(item["id"], item)
+            by_name.setdefault(namegetter(item), item)
+        with self._lock:
+            self._indexes.setdefault(name, (by_id, by_name))
+        return self._indexes[name]
+
+    def get(self, name, id_or_name):
+        """
+        Gets something from a table by id or name, which has to match exactly.
+        Matches by id if `id_or_name` is int, by name otherwise.
+        Either returns the matching item, or None if none was found.
+        """
+        by_id, by_name = self._index(name)
+        try:
+            if isinstance(id_or_name, int):
+                return by_id.get(id_or_name)
+            return by_name.get(id_or_name)
+        except TypeError:
+            return None  # unhashable, can't be a name
+
+    def _normalized_index(self, name):
+        key = ("normalized", name)
+        try:
+            return self._indexes[key]
+        except KeyError:
+            pass
+        table = self._tables[name]
+        names_by_id, by_normalized_name = {}, {}
+        for item in self.table(name):
+            if not item or not item["name"]:
+                continue  # null item, for lists having nothing as id 0 for example
+            normalized = table.normalize(table.namegetter(item))
+            names_by_id[item["id"]] = normalized
+            by_normalized_name.setdefault(normalized, item)
+        with self._lock:
+            self._indexes.setdefault(key, (names_by_id, by_normalized_name))
+        return self._indexes[key]
+
+    def find(self, name, search):
+        """
+        Finds something in a table by name, which doesn't have to be an exact match.
+        See `datautils.find_similar` for details.
+        For tables with a normalization, the normalized names are computed only once,
+        and a name normalizing to exactly one of them is found without a fuzzy search.
+        """
+        lst = self.table(name)
+        table = self._tables[name]
+        if table.normalize is None:
+            return find_similar(lst, search, namegetter=table.namegetter)
+        names_by_id, by_normalized_name = self._normalized_index(name)
+        search = table.normalize(search)
+        item = by_normalized_name.get(search)
+        if item is not None:
+            metrics.name_index.labels(name, "hit").inc()
+            return {item["id"]: item}
+        metrics.name_index.labels(name, "miss").inc()
+        return find_similar(lst, search, namegetter=lambda item: names_by_id[item["id"]])
+
+    def complete(self, name, prefix, limit=10):
+        """
+        Returns up to `limit` names from a table which start with `prefix`.
+        See `autocomplete.PrefixIndex` for details.
+        """
+        key = ("prefix", name)
+        index = self._indexes.get(key)
+        if index is None:
+            table = self._tables.get(name)
+            if table is None:
+                raise ValueError("Generation %d has no %s data" % (self.number, name))
+            index = PrefixIndex(self.table(name), table.namegetter, table.normalize)
+            with self._lock:
+                index = self._indexes.setdefault(key, index)
+        return index.complete(prefix, limit)
+
+    def form_species(self, species_id, form=0, item=None):
+        """
+        Returns the (species, formname) of a species adjusted to one of its forms,
+        see `forms.adjust_species`. `item` is the held item's name, which only matters
+        for species like Arceus. Each adjusted species is computed once and shared,
+        so it must not be modified.
+        """
+        if not forms.has_item_forms(species_id):
+            item = None
+        key = ("form", species_id, form, item)
+        try:
+            return self._indexes[key]
+        except KeyError:
+            pass
+        result = forms.adjust_species(self.table("pokedex")[species_id], form, item)
+        with self._lock:
+            return self._indexes.setdefault(key, result)
+
+    abilities = property(lambda self: self.table("abilities"))
+    items     = property(lambda self: self.table("items"))
+    moves     = property(lambda self: self.table("moves"))
+    pokedex   = property(lambda self: self.table("pokedex"))
+    natures   = property(lambda self: self.table("natures"))
+    balls     = property(lambda self: self.table("balls"))
+    types     = property(lambda self: self.table("types"))
+
+    get_ability  = partialmethod(get, "abilities")
+    get_item     = partialmethod(get, "items")
+    get_move     = partialmethod(get, "moves")
+    get_pokemon  = partialmethod(get, "pokedex")
+    get_nature   = partialmethod(get, "natures")
+    get_ball     = partialmethod(get, "balls")
+
+    find_ability = partialmethod(find, "abilities")
+    find_item    = partialmethod(find, "items")
+    find_move    = partialmethod(find, "moves")
+    find_pokemon = partialmethod(find, "pokedex")
+    find_nature  = partialmethod(find, "natures")
+    find_ball    = partialmethod(find, "balls")
+
+
+def _data_path(name):
+    return path.join(ROOT_DIR, name)
+
+def _ball_namegetter(ball):
+    return ball["name"].rsplit(" Ball", 1)[0]
+
+def _load_gen4_moves():
+    moves = load_from_json_list(_data_path("gen4data/moves.json"))
+    # remove moves without ids
+    return [m for m in moves if m["id"] is not None]
+
+_natures = Table(lambda: globaldata.NATURES)
+
+_GENERATIONS = {
+    1: Generation(1, {
+        "items":     Table(lambda: list(build_from_json_dict(_data_path("gen1data/items.json")))),
+        "moves":     Table(lambda: load_from_json_list(_data_path("gen1data/moves.json"))),
+        "natures":   _natures,
+        "types":     Table(lambda: globaldata.TYPES),
+        # TODO POKEDEX
+    }),
+    4: Generation(4, {
+        "abilities": Table(lambda: list(build_from_json_list(_data_path("gen4data/abilities.json")))),
+        "items":     Table(lambda: list(build_from_json_list(_data_path("gen4data/items.json")))),
+        "moves":     Table(_load_gen4_moves),
+        "types":     Table(lambda: load_from_json_list(_data_path("gen4data/types.json"))),
+        "balls":     Table(lambda: load_from_json_list(_data_path("pbrdata/balls.json")), namegetter=_ball_namegetter),
+        "pokedex":   Table(lambda: load_from_json_list(_data_path("gen4data/pokedex.json")), normalize=normalize_name),
+        "natures":   _natures,
+    }),
+}
+
+
+def register_generation(generation):
+    """Registers a Generation, replacing any previously registered one with the same number."""
+    _GENERATIONS[generation.number] = generation
+
+
+def get_generation(generation=None):
+    """
+    Returns the registered Generation with the given number.
+    Defaults to DEFAULT_GENERATION. Generation objects are returned as-is.
+    """
+    if isinstance(generation, Generation):
+        return generation
+    if generation is None:
+        generation = DEFAULT_GENERATION
+    try:
+        return _GENERATIONS[generation]
+    except (KeyError, TypeError):
+        raise ValueError("Unsupported generation: %s" % (generation,))
@@ -13,6 +13,8 @@ TYPES = load_from_json_list(path.join(ROOT_DIR, "globaldata/types.json"))
 DEOXYS_BASESTATS = load_from_json_list(path.join(ROOT_DIR, "globaldata/deoxys_basestats.json"))
 WORMADAM_BASESTATS = load_from_json_list(path.join(ROOT_DIR, "globaldata/wormadam_basestats.json"))
 NATURAL_GIFT_EFFECTS = load_from_json_list(path.join(ROOT_DIR, "globaldata/natural_gift_effects.json"))
+# attacking type -> defending type -> multiplier, for all non-neutral matchups as of gen 4
+TYPE_EFFECTIVENESS = load_from_json_list(path.join(ROOT_DIR, "globaldata/type_effectiveness.json"))
 
 get_nature = partial(get_exact, NATURES)
 find_nature = partial(find_similar, NATURES)
@@ -0,0 +1,210 @@
+"""
+Keeping instantiated Pokémon of sets ready ahead of time, so starting a match
+doesn't have to wait for `instantiate_pokeset`, which can take long for sets
+with restrictive combinations and separations.
+
+An InstanceBuffer holds a bounded queue of instances per set, refilled by a
+background thread. Instantiation is pure python and holds the GIL, so the
+thread helps by working ahead while the process is idle, e.g. between matches.
+"""
+
+import logging
+import random
+import threading
+from collections import deque
+
+from . import instantiate_pokeset, metrics
+from .memory import BUDGETS
+from .rng import get_rng, derive_rng
+
+log = logging.getLogger(__name__)
+
+# estimate of the memory an instance takes, to turn a memory bound into a number of instances
+INSTANCE_BYTES = BUDGETS["instance"]
+
+buffer_gets = metrics.REGISTRY.counter(
+    "pokecat_instance_buffer_gets", "Instances taken from an InstanceBuffer, by whether one was ready "
+    "or it had to be instantiated on the spot.", ("result",))
+
+
+class InstanceBuffer:
+    """
+    Keeps up to `depth` instances of each set ready, instantiated by a background thread.
+    Use as a context manager or call `close()` to stop the thread.
+
+    Arguments:
+        pokesets: Defaults to None. Dict of set ids to populated sets to buffer instances of.
+                  More can be added with `add`. Set ids can be anything hashable.
+        depth: Defaults to 3. How many instances to keep ready per set.
+        max_instances: Defaults to None, which is unbounded. How many instances to keep ready in total.
+        max_bytes: Defaults to None, which is unbounded. Roughly how much memory the ready
+                   instances may take, estimated as INSTANCE_BYTES per instance.
+        rng: Defaults to None. See `rng.get_rng`. The background thread and the callers of `get`
+             each use their own generator, seeded from `rng`, so a `random.Random` or NumPy
+             `Generator` passed in is only drawn from while constructing the buffer.
+             If a seed is supplied, the background thread's and the fallback's instances
+             are each reproducible, but which instance `get` returns depends on timing.
+
+    If instantiating a set fails in the background, the error is logged and the set is no
+    longer topped up until it is replaced with `add`. `get` then raises the error itself.
+    """
+
+    def __init__(self, pokesets=None, depth=3, max_instances=None, max_bytes=None, rng=None):
+        if depth < 1:
+            raise ValueError("depth must be at least 1, not %s" % depth)
+        self.depth = depth
+        capacity = float("inf")
+        if max_instances is not None:
+            capacity = max_instances
+        if max_bytes is not None:
+            capacity = min(capacity, max_bytes // INSTANCE_BYTES)
+        self.capacity = capacity
+        # separate RNGs, since the background thread and the callers of `get` run concurrently
+        if rng is None:
+            self._rng, self._fallback_rng = random.Random(), random.Random()
+        else:
+            if not isinstance(rng, (int, str, bytes)) or isinstance(rng, bool):
+                rng = get_rng(rng).randint(0, 2 ** 63 - 1)
+            self._rng = derive_rng(rng, "background")
+            self._fallback_rng = derive_rng(rng, "fallback")
+        self._pokesets = {}
+        self._buffers = {}
+        self._pending = deque()  # set ids to top up, in the order they were requested
+        self._queued = set()
+        self._failed = set()  # set ids whose instantiation failed in the background
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        for set_id, pokeset in (pokesets or {}).items():
+            self.add(set_id, pokeset)
+        self._thread = threading.Thread(target=self._run, name="pokecat-instance-buffer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Number of instances ready in total."""
+        return self._size
+
+    def __contains__(self, set_id):
+        return set_id in self._pokesets
+
+    def ready(self, set_id):
+        """Number of instances ready for a set."""
+        return len(self._buffers[set_id])
+
+    def _request(self, set_id):
+        # must hold the lock
+        if set_id not in self._queued and set_id not in self._failed:
+            self._queued.add(set_id)
+            self._pending.append(set_id)
+            self._wakeup.notify()
+
+    def add(self, set_id, pokeset):
+        """Adds a set, or replaces it and discards its ready instances."""
+        with self._lock:
+            self._discard(set_id)
+            self._failed.discard(set_id)
+            self._pokesets[set_id] = pokeset
+            self._buffers[set_id] = deque()
+            self._request(set_id)
+
+    def remove(self, set_id):
+        """Removes a set and discards its ready instances."""
+        with self._lock:
+            if set_id not in self._pokesets:
+                raise KeyError(set_id)
+            self._discard(set_id)
+            self._failed.discard(set_id)
+
+    def _discard(self, set_id):
+        # must hold the lock
+        buffer = self._buffers.pop(set_id, None)
+        if buffer:
+            self._size -= len(buffer)
+            self._wakeup.notify()
+        self._pokesets.pop(set_id, None)
+
+    def get(self, set_id):
+        """
+        Returns an instance of a set. Takes a ready one if there is one, in O(1),
+        otherwise instantiates one on the spot. Either way, the set gets topped up in the background.
+
+        Throws:
+            KeyError: If the set wasn't added.
+        """
+        with self._lock:
+            buffer = self._buffers[set_id]
+            if buffer:
+                instance = buffer.popleft()
+                self._size -= 1
+                # the set is usually still queued, but the thread may be waiting for room
+                self._wakeup.notify()
+            else:
+                instance = None
+                pokeset = self._pokesets[set_id]
+            self._request(set_id)
+        if instance is not None:
+            buffer_gets.labels("ready").inc()
+            return instance
+        buffer_gets.labels("instantiated").inc()
+        return instantiate_pokeset(pokeset, rng=self._fallback_rng)
+
+    def close(self, timeout=None):
+        """Stops the background thread and discards all ready instances."""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join(timeout)
+        with self._lock:
+            for buffer in self._buffers.values():
+                buffer.clear()
+            self._size = 0
+
+    def _next_set(self):
+        # must hold the lock. returns the id and set to instantiate next, or None when closed
+        while True:
+            if self._closed:
+                return None
+            if self._pending and self._size < self.capacity:
+                set_id = self._pending.popleft()
+                self._queued.discard(set_id)
+                buffer = self._buffers.get(set_id)
+                if buffer is not None and len(buffer) < self.depth:
+                    return set_id, self._pokesets[set_id]
+                continue
+            self._wakeup.wait()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                work = self._next_set()
+            if work is None:
+                return
+            set_id, pokeset = work
+            try:
+                instance = instantiate_pokeset(pokeset, rng=self._rng)
+            except Exception:
+                log.exception("Failed to instantiate set %r in the background, no longer buffering it", set_id)
+                with self._lock:
+                    if self._pokesets.get(set_id) is pokeset:
+                        self._failed.add(set_id)
+                        if set_id in self._queued:
+                            self._queued.discard(set_id)
+                            self._pending.remove(set_id)
+                continue
+            with self._lock:
+                buffer = self._buffers.get(set_id)
+                if buffer is None or self._pokesets[set_id] is not pokeset:
+                    continue  # removed or replaced in the meantime
+                if len(buffer) < self.depth and self._size < self.capacity:
+                    buffer.append(instance)
+                    self._size += 1
+                if len(buffer) < self.depth:
+                    # back of the queue, so all sets get topped up evenly
+                    self._request(set_id)
@@ -0,0 +1,136 @@
+"""
+Measuring how much memory pokecat's data tables, populated sets and instances take,
+using tracemalloc. `run_benchmark` measures the scenarios of a match service:
+loading the data tables, populating pools of 1k and 10k sets and keeping
+100k instantiated Pokémon. Also available as `pokecat membench`.
+
+`BUDGETS` holds the bytes each object may retain, which the tests assert,
+so memory regressions show up before they show up as OOM kills.
+"""
+
+import gc
+import tracemalloc
+from collections import namedtuple
+
+from . import populate_pokeset, instantiate_pokeset, generate_random_pokeset
+from .diagnostics import Diagnostics
+from .generations import get_generation
+from .rng import derive_rng
+
+
+# name, how many objects were created, and bytes retained afterwards and at peak while creating them
+MemoryUsage = namedtuple("MemoryUsage", ["name", "count", "retained", "peak"])
+
+# maximum bytes retained per object, roughly 25% above what they currently take
+BUDGETS = {
+    "tables": 1536 * 1024,  # all data tables and indexes of a generation
+    "populated set": 8000,
+    "instance": 7000,
+}
+
+
+def per_object(usage):
+    """Returns the bytes retained per object of a MemoryUsage."""
+    return usage.retained / max(usage.count, 1)
+
+
+def measure(name, count, function, *args):
+    """
+    Calls `function(*args)` while tracing allocations, and returns (MemoryUsage, result).
+    The result is kept alive while measuring, so `retained` is what it takes.
+    If tracemalloc isn't tracing yet, it is started and stopped again afterwards.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = function(*args)
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+    return MemoryUsage(name, count, current - before, peak - before), result
+
+
+def raw_pokesets(amount, seed=0):
+    """Returns `amount` random sets as they are written in pool files, i.e. by names, to be populated."""
+    pokesets = []
+    for index in range(amount):
+        pokeset = generate_random_pokeset(rng=derive_rng(seed, index))
+        pokesets.append({
+            "species": pokeset["species"]["name"],
+            "setname": pokeset["setname"],
+            "nature": pokeset["nature"]["name"],
+            "ivs": pokeset["ivs"],
+            "evs": pokeset["evs"],
+            "moves": [[move["name"] for move in slot] for slot in pokeset["moves"]],
+            "ability": [ability["name"] for ability in pokeset["ability"]],
+            "item": [item["name"] for item in pokeset["item"]],
+            "ball": [ball["name"].rsplit(" Ball", 1)[0] for ball in pokeset["ball"]],
+            "gender": pokeset["gender"],
+            "shiny": pokeset["shiny"],
+            "hidden": pokeset["hidden"],
+            "biddable": pokeset["biddable"],
+        })
+    return pokesets
+
+
+def _load_tables(generation):
+    gen = generation.fresh()
+    for name in gen.table_names():
+        if any(isinstance(entry, dict) for entry in gen.table(name)):
+            gen.get(name, None)  # builds the index for lookups by name
+    return gen
+
+
+def measure_tables(generation=None):
+    """Measures loading and indexing all data tables of a generation."""
+    return measure("tables", 1, _load_tables, get_generation(generation))[0]
+
+
+def _populate_all(pokesets):
+    return [populate_pokeset(pokeset, diagnostics=Diagnostics()) for pokeset in pokesets]
+
+
+def measure_populate(amount, seed=0):
+    """
+    Measures populating a pool of `amount` random sets and keeping the populated sets.
+    The sets get populated once beforehand, so caches filled on first use aren't counted.
+    """
+    pokesets = raw_pokesets(amount, seed)
+    _populate_all(pokesets)
+    return measure("populated set", amount, _populate_all, pokesets)[0]
+
+
+def _instantiate_all(pokesets, amount):
+    return [instantiate_pokeset(pokesets[index % len(pokesets)], rng=index) for index in range(amount)]
+
+
+def measure_instantiate(amount, pool_size=1000, seed=0):
+    """Measures instantiating `amount` Pokémon from a pool of `pool_size` sets and keeping them."""
+    pokesets = _populate_all(raw_pokesets(min(amount, pool_size), seed))
+    return measure("instance", amount, _instantiate_all, pokesets, amount)[0]
+
+
+def run_benchmark(populate_amounts=(1000, 10000), instantiate_amount=100000):
+    """Measures the tables, populating pools of each of `populate_amounts` sets and instantiating Pokémon."""
+    usages = [measure_tables()]
+    usages.extend(measure_populate(amount) for amount in populate_amounts)
+    usages.append(measure_instantiate(instantiate_amount))
+    return usages
+
+
+def report(usages):
+    """Returns a human readable table of MemoryUsages, including whether they exceed their budget."""
+    lines = ["{:<16} {:>8} {:>14} {:>14} {:>12} {:>12}".format(
+        "measurement", "count", "retained [kB]", "peak [kB]", "per object", "budget")]
+    for usage in usages:
+        budget = BUDGETS.get(usage.name)
+        lines.append("{:<16} {:>8} {:>14.1f} {:>14.1f} {:>12.0f} {:>12}".format(
+            usage.name, usage.count, usage.retained / 1024, usage.peak / 1024, per_object(usage),
+            "-" if budget is None else ("%d" % budget if per_object(usage) <= budget else "%d EXCEEDED" % budget)))
+    return "\n".join(lines)
@@ -0,0 +1,264 @@
+"""
+In-process metrics about populating and instantiating sets, e.g. how often
+instantiation needs many rerolls or names get autocorrected.
+
+Metrics are always collected into `REGISTRY`, which costs a lock and an
+addition per update. Nothing else happens until somebody reads them with
+`REGISTRY.prometheus()` (Prometheus text exposition format) or
+`REGISTRY.snapshot()` (a JSON-serializable dict).
+"""
+
+import threading
+from bisect import bisect_left
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return repr(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('%s="%s"' % (name, _escape(value)) for name, value in labels) + "}"
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        """Returns the child metric for the given label values, in the order of `labelnames`."""
+        try:
+            return self._children[values]
+        except KeyError:
+            pass
+        if len(values) != len(self.labelnames):
+            raise ValueError("%s expects labels %s, got %r" % (self.name, ", ".join(self.labelnames), values))
+        with self._lock:
+            return self._children.setdefault(values, self._new_child())
+
+    def _samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        return [(tuple(zip(self.labelnames, values)), child) for values, child in sorted(children)]
+
+    def reset(self):
+        with self._lock:
+            for child in self._children.values():
+                child.reset()
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, optionally split by labels."""
+    type = "counter"
+    _new_child = _CounterChild
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    @property
+    def value(self):
+        return self._default.value
+
+    def _prometheus(self):
+        return ["%s_total%s %s" % (self.name, _format_labels(labels), _format_value(child.value))
+                for labels, child in self._samples()]
+
+    def _snapshot(self):
+        return [{"labels": dict(labels), "value": child.value} for labels, child in self._samples()]
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.reset()
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def reset(self):
+        # the last count is for values above all bounds
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def buckets(self):
+        """Returns the cumulative (upper bound, count) of all buckets, including +Inf."""
+        with self._lock:
+            counts = list(self.counts)
+        result, total = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Histogram(_Metric):
+    """
+    Counts observed values in buckets with the given upper bounds, like Prometheus histograms.
+    Also keeps the sum and count of all values.
+    """
+    type = "histogram"
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _prometheus(self):
+        lines = []
+        for labels, child in self._samples():
+            for bound, count in child.buckets():
+                lines.append("%s_bucket%s %d" % (self.name, _format_labels(labels + (("le", _format_value(bound)),)), count))
+            lines.append("%s_sum%s %s" % (self.name, _format_labels(labels), _format_value(child.sum)))
+            lines.append("%s_count%s %d" % (self.name, _format_labels(labels), child.count))
+        return lines
+
+    def _snapshot(self):
+        return [{
+            "labels": dict(labels),
+            "buckets": [[None if bound == float("inf") else bound, count] for bound, count in child.buckets()],
+            "sum": child.sum,
+            "count": child.count,
+        } for labels, child in self._samples()]
+
+
+class _CacheInfo(_Metric):
+    """Exports the hits and misses of functools.lru_cache'd functions, read only when exporting."""
+    type = "counter"
+
+    def __init__(self, name, help):
+        super().__init__(name, help, ("cache", "result"))
+        self._functions = {}
+
+    def add(self, cache, function):
+        self._functions[cache] = function
+
+    def _values(self):
+        for cache, function in sorted(self._functions.items()):
+            info = function.cache_info()
+            yield (("cache", cache), ("result", "hit")), info.hits
+            yield (("cache", cache), ("result", "miss")), info.misses
+
+    def _prometheus(self):
+        return ["%s_total%s %d" % (self.name, _format_labels(labels), value) for labels, value in self._values()]
+
+    def _snapshot(self):
+        return [{"labels": dict(labels), "value": value} for labels, value in self._values()]
+
+    def reset(self):
+        pass  # lru_cache statistics can only be reset along with the cache
+
+
+class Registry:
+    """A collection of metrics which can be exported together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError("Metric %s is already registered" % metric.name)
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, buckets, labelnames=()):
+        return self._register(Histogram(name, help, buckets, labelnames))
+
+    def get(self, name):
+        return self._metrics[name]
+
+    def reset(self):
+        """Resets all metrics to zero, e.g. between tests or benchmark runs."""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def prometheus(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append("# HELP %s %s" % (name, metric.help.replace("\\", "\\\\").replace("\n", "\\n")))
+            lines.append("# TYPE %s %s" % (name, metric.type))
+            lines.extend(metric._prometheus())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Returns all metrics as a JSON-serializable dict, keyed by metric name."""
+        return {
+            name: {"type": metric.type, "help": metric.help, "samples": metric._snapshot()}
+            for name, metric in sorted(self._metrics.items())
+        }
+
+
+REGISTRY = Registry()
+
+_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+instantiate_attempts = REGISTRY.histogram(
+    "pokecat_instantiate_attempts", "Attempts instantiate_pokeset needed to respect a set's restrictions.",
+    (1, 2, 3, 5, 10, 25, 100, 1000, 9001))
+instantiate_rerolls = REGISTRY.counter(
+    "pokecat_instantiate_rerolls", "Instances instantiate_pokeset discarded for violating a set's restrictions.")
+instantiate_invalid = REGISTRY.counter(
+    "pokecat_instantiate_invalid", "Invalid instances returned after instantiate_pokeset ran out of attempts.")
+instantiate_seconds = REGISTRY.histogram(
+    "pokecat_instantiate_seconds", "Time spent per instantiate_pokeset call.", _LATENCY_BUCKETS)
+populate_seconds = REGISTRY.histogram(
+    "pokecat_populate_seconds", "Time spent per populate_pokeset call, including failed ones.", _LATENCY_BUCKETS)
+lookups = REGISTRY.counter(
+    "pokecat_lookups", "Names looked up in a data table while populating, by whether they matched exactly "
+    "or were autocorrected.", ("table", "result"))
+name_index = REGISTRY.counter(
+    "pokecat_name_index", "Searches for inexact names, by whether the normalized name index found them "
+    "or a fuzzy search was needed.", ("table", "result"))
+caches = REGISTRY._register(_CacheInfo(
+    "pokecat_cache", "Hits and misses of pokecat's memoized functions."))
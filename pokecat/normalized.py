@@ -0,0 +1,120 @@
+"""
+Normalized format for pools of populated sets, which stores every referenced
+species, move, item, ability, ball and nature only once.
+
+A normalized pool is a single document:
+
+    format: pokecat-normalized
+    version: 1
+    dictionary:
+        moves: {"52": {id: 52, name: Ember, pp: 25, ...}, ...}
+        ...
+    sets:
+    -   species: 493
+        moves: [[52, {id: 241, pp: 8, pp_ups: 1}], ...]
+        ...
+
+Within the sets, each of those objects is replaced by a reference: just its id
+if it is equal to the dictionary entry, or its id and the fields that differ,
+like pp and pp_ups of moves or the basestats and types of form-adjusted species.
+`expand_pool` turns a normalized pool back into the populated sets.
+`fileio.load_documents` does so automatically.
+"""
+
+from copy import deepcopy
+
+
+FORMAT = "pokecat-normalized"
+VERSION = 1
+
+# fields of a set containing objects which get stored in the dictionary,
+# and the dictionary section they are stored in
+REFERENCE_FIELDS = {
+    "species": "species",
+    "moves": "moves",
+    "item": "items",
+    "ability": "abilities",
+    "ball": "balls",
+    "nature": "natures",
+}
+# lists fields which are missing from an object, but present in its dictionary entry
+_REMOVED = "_removed"
+
+
+def _reference(obj, entries):
+    key = str(obj["id"])
+    entry = entries.setdefault(key, obj)
+    if entry is obj:
+        return obj["id"]
+    overrides = {k: v for k, v in obj.items() if k not in entry or entry[k] != v}
+    removed = [k for k in entry if k not in obj]
+    if removed:
+        overrides[_REMOVED] = removed
+    if not overrides:
+        return obj["id"]
+    overrides["id"] = obj["id"]
+    return overrides
+
+
+def _encode(value, entries):
+    if isinstance(value, list):
+        return [_encode(v, entries) for v in value]
+    if isinstance(value, dict):
+        return _reference(value, entries)
+    return value
+
+
+def _decode(value, entries):
+    if isinstance(value, list):
+        return [_decode(v, entries) for v in value]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return deepcopy(entries[str(value)])
+    if isinstance(value, dict):
+        obj = deepcopy(entries[str(value["id"])])
+        for key in value.get(_REMOVED, ()):
+            del obj[key]
+        obj.update((k, deepcopy(v)) for k, v in value.items() if k != _REMOVED)
+        return obj
+    return value
+
+
+def normalize_pool(pokesets):
+    """
+    Converts populated sets into a normalized pool document. The sets aren't modified,
+    but the document shares data with them. Key order of the referenced objects isn't kept.
+    """
+    dictionary = {section: {} for section in REFERENCE_FIELDS.values()}
+    sets = []
+    for pokeset in pokesets:
+        normalized = dict(pokeset)
+        for field, section in REFERENCE_FIELDS.items():
+            if field in normalized:
+                normalized[field] = _encode(normalized[field], dictionary[section])
+        sets.append(normalized)
+    return {
+        "format": FORMAT,
+        "version": VERSION,
+        "dictionary": dictionary,
+        "sets": sets,
+    }
+
+
+def is_normalized_pool(document):
+    return isinstance(document, dict) and document.get("format") == FORMAT
+
+
+def expand_pool(document):
+    """Converts a normalized pool document back into a list of populated sets."""
+    if not is_normalized_pool(document):
+        raise ValueError("Not a normalized pokecat pool")
+    if document.get("version") != VERSION:
+        raise ValueError("Unsupported normalized pool version: %s" % document.get("version"))
+    dictionary = document["dictionary"]
+    pokesets = []
+    for normalized in document["sets"]:
+        pokeset = deepcopy(normalized)
+        for field, section in REFERENCE_FIELDS.items():
+            if field in pokeset:
+                pokeset[field] = _decode(pokeset[field], dictionary[section])
+        pokesets.append(pokeset)
+    return pokesets
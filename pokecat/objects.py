@@ -2,6 +2,7 @@
 import re
 from enum import IntEnum
 from collections import namedtuple
+from functools import lru_cache
 
 
 Ability = namedtuple("Ability", ["id", "name", "description"])
@@ -34,7 +35,10 @@ def stats_asdict(stats):
 Stats._asdict = stats_asdict
 
 Move = namedtuple("Move", ["id", "category", "type", "accuracy", "name", "displayname", "power", "pp", "pp_ups"])
-Move.name_id = property(lambda self: re.sub(r"[^a-zA-Z0-9]", "", self.name).lower())
+@lru_cache(maxsize=None)
+def _move_name_id(name):
+    return re.sub(r"[^a-zA-Z0-9]", "", name).lower()
+Move.name_id = property(lambda self: _move_name_id(self.name))
 Move.__new__.__defaults__ = (0,)
 
 class Type(IntEnum):
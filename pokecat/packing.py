@@ -0,0 +1,173 @@
+"""
+Fixed-size binary records of instantiated Pokémon, e.g. for handing teams to
+pbrEngine without encoding and parsing JSON for every match.
+
+Each Pokémon is a little-endian record of RECORD_SIZE bytes consisting of
+numbers only: ids of the species, nature, item, ability, ball and moves,
+the (form-adjusted) types, stats, IVs, EVs, move PP, PP Ups, type, category
+and power (after special cases like Hidden Power), gender, level, form and
+the shiny, biddable and hidden flags. Names and tags aren't included, they
+can be looked up by the ids. Types without a number, like "???", are -1,
+and missing move slots are all zeros with type -1.
+A team is the records of its Pokémon concatenated.
+
+`DTYPE` describes the same layout as a NumPy structured dtype (requires numpy),
+so `numpy.frombuffer(pack_team(team), dtype=DTYPE)` reads packed teams without copying.
+"""
+
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from .stats import statnames
+from .utils import TYPES, get_gender_number, get_type_number, get_category_number
+
+
+MAX_MOVES = 4
+
+_FLAG_SHINY = 1
+_FLAG_BIDDABLE = 2
+_FLAG_HIDDEN = 4
+
+_GENDERS = ("m", "f", None)
+_CATEGORIES = ("Physical", "Special", "Status")
+
+# (field, struct format), in record order
+_HEADER = (
+    ("species", "H"), ("form", "B"), ("level", "B"), ("gender", "B"), ("flags", "B"),
+    ("happiness", "B"), ("nature", "B"), ("item", "H"), ("ability", "H"), ("ball", "H"),
+    ("types", "2b"), ("stats", "6H"), ("curr_hp", "H"), ("ivs", "6B"), ("evs", "6B"),
+)
+_MOVE = (("id", "H"), ("pp", "B"), ("pp_ups", "B"), ("type", "b"), ("category", "B"), ("power", "H"))
+
+RECORD = struct.Struct("<" + "".join(fmt for _, fmt in _HEADER) + "".join(fmt for _, fmt in _MOVE) * MAX_MOVES)
+RECORD_SIZE = RECORD.size
+
+_EMPTY_MOVE = (0, 0, 0, -1, 0, 0)
+
+
+def _numpy_dtype():
+    if np is None:
+        return None
+    kinds = {"B": "u1", "b": "i1", "H": "<u2"}
+
+    def field(name, fmt):
+        if len(fmt) > 1:
+            return (name, kinds[fmt[-1]], (int(fmt[:-1]),))
+        return (name, kinds[fmt])
+    move = np.dtype([field(name, fmt) for name, fmt in _MOVE])
+    return np.dtype([field(name, fmt) for name, fmt in _HEADER] + [("moves", move, (MAX_MOVES,))])
+
+
+DTYPE = _numpy_dtype()
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("pokecat's structured arrays of packed Pokémon require numpy to be installed")
+
+
+def _values(pokemon):
+    flags = ((_FLAG_SHINY if pokemon["shiny"] else 0)
+             | (_FLAG_BIDDABLE if pokemon["biddable"] else 0)
+             | (_FLAG_HIDDEN if pokemon["hidden"] else 0))
+    types = [get_type_number(type_) for type_ in pokemon["species"]["types"]]
+    values = [
+        pokemon["species"]["id"], pokemon["form"], pokemon["level"],
+        get_gender_number(pokemon["gender"]), flags, pokemon["happiness"],
+        pokemon["nature"]["id"], pokemon["item"]["id"], pokemon["ability"]["id"], pokemon["ball"]["id"],
+        types[0], types[1] if len(types) > 1 else -1,
+    ]
+    stats, ivs, evs = pokemon["stats"], pokemon["ivs"], pokemon["evs"]
+    values.extend(stats[stat] for stat in statnames)
+    values.append(pokemon.get("curr_hp", stats["hp"]))
+    values.extend(ivs[stat] for stat in statnames)
+    values.extend(evs[stat] for stat in statnames)
+    moves = pokemon["moves"]
+    if not 1 <= len(moves) <= MAX_MOVES:
+        raise ValueError("Pokémon must have between 1 and %d moves, but has %d" % (MAX_MOVES, len(moves)))
+    for move in moves:
+        values.extend((move["id"], move["pp"], move["pp_ups"], get_type_number(move["type"]),
+                       get_category_number(move["category"]), move["power"]))
+    for _ in range(MAX_MOVES - len(moves)):
+        values.extend(_EMPTY_MOVE)
+    return values
+
+
+def pack_pokemon_into(buffer, offset, pokemon):
+    """Writes the record of an instantiated Pokémon into a writable buffer at `offset`."""
+    try:
+        RECORD.pack_into(buffer, offset, *_values(pokemon))
+    except struct.error as ex:
+        raise ValueError("Pokémon %s doesn't fit into a packed record: %s" % (pokemon["species"]["name"], ex))
+
+
+def pack_pokemon(pokemon):
+    """Returns the record of an instantiated Pokémon as bytes."""
+    buffer = bytearray(RECORD_SIZE)
+    pack_pokemon_into(buffer, 0, pokemon)
+    return bytes(buffer)
+
+
+def _pack_buffer(team):
+    buffer = bytearray(RECORD_SIZE * len(team))
+    for index, pokemon in enumerate(team):
+        pack_pokemon_into(buffer, index * RECORD_SIZE, pokemon)
+    return buffer
+
+
+def pack_team(team):
+    """Returns the records of a list of instantiated Pokémon, concatenated into one bytes object."""
+    return bytes(_pack_buffer(team))
+
+
+def _record(values):
+    it = iter(values)
+    pokemon = {}
+    for field, fmt in _HEADER:
+        if len(fmt) > 1:
+            pokemon[field] = [next(it) for _ in range(int(fmt[:-1]))]
+        else:
+            pokemon[field] = next(it)
+    flags = pokemon.pop("flags")
+    pokemon["shiny"] = bool(flags & _FLAG_SHINY)
+    pokemon["biddable"] = bool(flags & _FLAG_BIDDABLE)
+    pokemon["hidden"] = bool(flags & _FLAG_HIDDEN)
+    pokemon["gender"] = _GENDERS[pokemon["gender"]]
+    pokemon["types"] = [TYPES[number] for number in pokemon["types"] if number >= 0]
+    for field in ("stats", "ivs", "evs"):
+        pokemon[field] = dict(zip(statnames, pokemon[field]))
+    pokemon["moves"] = []
+    for _ in range(MAX_MOVES):
+        move = dict(zip((name for name, _ in _MOVE), (next(it) for _ in _MOVE)))
+        if not move["id"]:
+            continue
+        move["type"] = TYPES[move["type"]] if move["type"] >= 0 else None
+        move["category"] = _CATEGORIES[move["category"]]
+        pokemon["moves"].append(move)
+    return pokemon
+
+
+def unpack_pokemon(data, offset=0):
+    """
+    Reads the record at `offset` of a bytes-like object. Returns a dict with the fields of the record,
+    where species, nature, item, ability and ball are ids, and types are names.
+    """
+    return _record(RECORD.unpack_from(data, offset))
+
+
+def unpack_team(data):
+    """Reads all records of a packed team, see `unpack_pokemon`."""
+    if len(data) % RECORD_SIZE:
+        raise ValueError("Packed team has %d bytes, which isn't a multiple of the record size %d"
+                         % (len(data), RECORD_SIZE))
+    return [_record(values) for values in RECORD.iter_unpack(data)]
+
+
+def pack_array(pokemons):
+    """Returns the records of instantiated Pokémon as a NumPy structured array of DTYPE."""
+    _require_numpy()
+    return np.frombuffer(_pack_buffer(pokemons), dtype=DTYPE)
@@ -0,0 +1,108 @@
+"""
+Loading a pool of sets split across many YAML files, e.g. one per maintainer.
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from . import populate_pokeset
+from .diagnostics import Diagnostics
+from .fileio import load_documents
+
+
+# where a set came from: the file and the index of the document within it,
+# which is None for errors concerning the whole file
+Source = namedtuple("Source", ["filename", "index"])
+PoolEntry = namedtuple("PoolEntry", ["pokeset", "source"])
+PoolMessage = namedtuple("PoolMessage", ["source", "identifier", "message"])
+Duplicate = namedtuple("Duplicate", ["set_id", "first", "duplicate"])
+Pool = namedtuple("Pool", ["entries", "warnings", "errors", "duplicates"])
+
+
+def get_set_id(pokeset):
+    """Returns the identity of a populated set, the same as `objects.Pokemon.id`."""
+    return (pokeset["species"]["id"], pokeset["setname"])
+
+
+POOL_EXTENSIONS = tuple(extension + compression
+                        for extension in (".yaml", ".yml", ".json", ".jsonl")
+                        for compression in ("", ".gz", ".zst"))
+
+
+def find_pool_files(directory, extensions=POOL_EXTENSIONS):
+    """Returns the paths of all files with the given extensions below a directory, in a stable order."""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith(tuple(extensions)):
+                found.append(os.path.join(root, filename))
+    return sorted(found)
+
+
+def _populate_file(filename, skip_ev_check=False):
+    try:
+        documents = load_documents(filename)
+    except (yaml.YAMLError, ValueError, OSError) as ex:
+        return filename, [(None, None, None, [], "Could not read file: {}".format(ex))]
+    results = []
+    for index, document in enumerate(documents):
+        if not isinstance(document, dict):
+            results.append((index, repr(document), None, [], "document is not a set"))
+            continue
+        identifier = "{} {}".format(document.get("species"), document.get("setname"))
+        diagnostics = Diagnostics()
+        try:
+            populated = populate_pokeset(document, skip_ev_check=skip_ev_check, diagnostics=diagnostics)
+        except ValueError as ex:
+            results.append((index, identifier, None, [], str(ex)))
+        else:
+            results.append((index, identifier, populated, [d.message for d in diagnostics], None))
+    return filename, results
+
+
+def load_pool(directory, processes=None, skip_ev_check=False):
+    """
+    Populates all set files below a directory and merges them into one pool.
+
+    The files are populated in parallel, but merged in a stable order:
+    by path, then by position within the file. Sets with the same identity
+    (see `get_set_id`) as an earlier set are reported as duplicates and left out.
+
+    Arguments:
+        directory: directory to search for YAML, JSON and JSON Lines files, including
+                   subdirectories. See `fileio` for the formats.
+        processes: Defaults to None, which uses one process per CPU.
+                   1 populates everything in the current process.
+        skip_ev_check: passed on to `populate_pokeset`.
+    Returns:
+        A Pool with the list of merged `entries` and lists of `warnings`, `errors` and
+        `duplicates`, each of them carrying the file and document index of the set.
+        Files which can't be read or parsed are reported in `errors` with an index
+        and identifier of None.
+    """
+    filenames = find_pool_files(directory)
+    if processes == 1 or len(filenames) <= 1:
+        results = [_populate_file(filename, skip_ev_check) for filename in filenames]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_populate_file, filenames, [skip_ev_check] * len(filenames)))
+
+    entries, warnings, errors, duplicates = [], [], [], []
+    sources_by_id = {}
+    for filename, file_results in results:
+        for index, identifier, populated, messages, error in file_results:
+            source = Source(filename, index)
+            warnings.extend(PoolMessage(source, identifier, message) for message in messages)
+            if error is not None:
+                errors.append(PoolMessage(source, identifier, error))
+                continue
+            set_id = get_set_id(populated)
+            first = sources_by_id.setdefault(set_id, source)
+            if first is not source:
+                duplicates.append(Duplicate(set_id, first, source))
+                continue
+            entries.append(PoolEntry(populated, source))
+    return Pool(entries, warnings, errors, duplicates)
@@ -0,0 +1,254 @@
+"""
+Columnar binary store for populated pools, written by `pokecat compile`.
+
+Numeric fields (level, happiness, form, rarity, stats, ivs, evs, species id and
+the boolean flags) are stored as fixed-width arrays with one entry per set.
+All other fields are dictionary-encoded: every distinct string, or JSON encoding
+for structured fields like moves or species, is stored once and referenced by
+its index. The reader memory-maps the file and only decodes a set when it is
+accessed, so processes opening the same file share one copy in the page cache.
+
+File layout: MAGIC, format version and header length (uint32 each),
+the header as JSON, then all arrays, each aligned to 8 bytes.
+"""
+
+import json
+import mmap
+import sys
+from array import array
+from collections.abc import Sequence
+
+
+MAGIC = b"PKCATCOL"
+VERSION = 1
+
+_ALIGNMENT = 8
+_STAT_KEYS = ("hp", "atk", "def", "spA", "spD", "spe")
+_STAT_FIELDS = ("stats", "ivs", "evs")
+_NUMERIC_FIELDS = {
+    "level": "h",
+    "happiness": "h",
+    "form": "h",
+    "rarity": "d",
+}
+_FLAGS = ("shiny", "biddable", "hidden")
+_STRING_FIELDS = ("setname", "displayname", "ingamename")
+_CODE_FORMAT = "I"
+_OFFSET_FORMAT = "Q"
+
+
+def _encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _check_number(pokeset, field, value, integer=True):
+    if isinstance(value, bool) or not isinstance(value, int if integer else (int, float)):
+        raise ValueError("Cannot compile set {} {}: {} must be a number, not {!r}"
+                         .format(pokeset["species"]["name"], pokeset["setname"], field, value))
+    return value
+
+
+def compile_pool(pokesets, outfile):
+    """
+    Writes populated sets into a columnar pool file, which can be opened with `open_pool`.
+    All sets must have the same fields, which is the case for sets from `populate_pokeset`.
+
+    Arguments:
+        pokesets: iterable of populated sets.
+        outfile: filename or binary file object to write to.
+    Returns:
+        The number of sets written.
+    """
+    fields = None
+    columns = {}
+    for field, fmt in _NUMERIC_FIELDS.items():
+        columns[field] = array(fmt)
+    for field in _STAT_FIELDS:
+        for stat in _STAT_KEYS:
+            columns["%s.%s" % (field, stat)] = array("h")
+    columns["species.id"] = array("h")
+    columns["flags"] = array("B")
+    strings, codes = [], {}
+
+    def encode(value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(strings)
+            strings.append(value)
+        return code
+
+    count = 0
+    for pokeset in pokesets:
+        if fields is None:
+            fields = list(pokeset)
+            for field in fields:
+                if field not in columns and field not in _STAT_FIELDS and field not in _FLAGS:
+                    columns[field] = array(_CODE_FORMAT)
+        elif set(pokeset) != set(fields):
+            raise ValueError("Cannot compile set {} {}: all sets must have the same fields, expected {}"
+                             .format(pokeset["species"]["name"], pokeset["setname"], ", ".join(fields)))
+        for field, fmt in _NUMERIC_FIELDS.items():
+            columns[field].append(_check_number(pokeset, field, pokeset[field], integer=fmt != "d"))
+        for field in _STAT_FIELDS:
+            for stat in _STAT_KEYS:
+                value = _check_number(pokeset, field, pokeset[field][stat])
+                columns["%s.%s" % (field, stat)].append(value)
+        columns["species.id"].append(pokeset["species"]["id"])
+        columns["flags"].append(sum(1 << bit for bit, flag in enumerate(_FLAGS) if pokeset[flag]))
+        for field in fields:
+            column = columns.get(field)
+            if column is None or column.typecode != _CODE_FORMAT:
+                continue
+            value = pokeset[field]
+            column.append(encode(value if field in _STRING_FIELDS else _encode_json(value)))
+        count += 1
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array(_OFFSET_FORMAT, [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    blobs = {name: (column.typecode, column.tobytes()) for name, column in columns.items()}
+    blobs["dictionary.offsets"] = (_OFFSET_FORMAT, offsets.tobytes())
+    blobs["dictionary.data"] = ("B", b"".join(encoded))
+
+    layout = {}
+    position = 0
+    for name, (fmt, blob) in blobs.items():
+        layout[name] = {"offset": position, "size": len(blob), "format": fmt}
+        position += -(-len(blob) // _ALIGNMENT) * _ALIGNMENT
+    header = json.dumps({
+        "count": count,
+        "byteorder": sys.byteorder,
+        "fields": fields or [],
+        "strings": list(_STRING_FIELDS),
+        "flags": list(_FLAGS),
+        "arrays": layout,
+    }).encode("utf-8")
+    start = len(MAGIC) + 8 + len(header)
+    padding = -start % _ALIGNMENT
+
+    def write(f):
+        f.write(MAGIC)
+        f.write(array("I", [VERSION, len(header) + padding]).tobytes())
+        f.write(header + b" " * padding)
+        for fmt, blob in blobs.values():
+            f.write(blob)
+            f.write(b"\0" * (-len(blob) % _ALIGNMENT))
+
+    if hasattr(outfile, "write"):
+        write(outfile)
+    else:
+        with open(outfile, "wb") as f:
+            write(f)
+    return count
+
+
+class PoolStore(Sequence):
+    """
+    Read-only sequence of the populated sets in a pool file written by `compile_pool`.
+    The file is memory-mapped, and sets are decoded on access into fresh dicts
+    equal to the ones that were compiled. Use `open_pool()` to open one.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            self._init_arrays(filename)
+        except Exception:
+            self.close()
+            raise
+        self._strings = {}
+
+    def _init_arrays(self, filename):
+        mm = self._mmap
+        start = len(MAGIC) + 8
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError("%s is not a compiled pokecat pool" % filename)
+        version, header_length = array("I", mm[len(MAGIC):start])
+        if version != VERSION:
+            raise ValueError("%s has unsupported pool format version %d" % (filename, version))
+        header = json.loads(mm[start:start + header_length].decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("%s was compiled on a %s-endian machine" % (filename, header["byteorder"]))
+        data_start = start + header_length
+        self._count = header["count"]
+        self._fields = header["fields"]
+        self._string_fields = frozenset(header["strings"])
+        self._flags = header["flags"]
+        view = memoryview(mm)
+        self._views.append(view)
+        self._arrays = {}
+        for name, spec in header["arrays"].items():
+            begin = data_start + spec["offset"]
+            array_view = view[begin:begin + spec["size"]]
+            self._views.append(array_view)
+            self._arrays[name] = array_view.cast(spec["format"])
+            self._views.append(self._arrays[name])
+        self._offsets = self._arrays["dictionary.offsets"]
+        self._data_start = data_start + header["arrays"]["dictionary.data"]["offset"]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("pool index out of range")
+        arrays = self._arrays
+        pokeset = {}
+        for field in self._fields:
+            if field in _NUMERIC_FIELDS:
+                pokeset[field] = arrays[field][index]
+            elif field in _STAT_FIELDS:
+                pokeset[field] = {stat: arrays["%s.%s" % (field, stat)][index] for stat in _STAT_KEYS}
+            elif field in self._flags:
+                pokeset[field] = bool(arrays["flags"][index] & (1 << self._flags.index(field)))
+            else:
+                string = self.string(arrays[field][index])
+                pokeset[field] = string if field in self._string_fields else json.loads(string)
+        return pokeset
+
+    def string(self, code):
+        """Returns the dictionary entry with the given code."""
+        try:
+            return self._strings[code]
+        except KeyError:
+            pass
+        start = self._data_start
+        string = self._mmap[start + self._offsets[code]:start + self._offsets[code + 1]].decode("utf-8")
+        self._strings[code] = string
+        return string
+
+    def column(self, name):
+        """
+        Returns a read-only memoryview of a numeric column with one entry per set,
+        e.g. "rarity", "level", "species.id" or "stats.spe".
+        The "flags" column has bit n set for the n-th of shiny, biddable and hidden.
+        """
+        if name.startswith("dictionary.") or name not in self._arrays:
+            raise KeyError("Pool has no numeric column %s" % name)
+        if name in self._fields and name not in _NUMERIC_FIELDS:
+            raise KeyError("Pool has no numeric column %s" % name)
+        return self._arrays[name]
+
+    def close(self):
+        """Releases the memory mapping. Views returned by `column` must not be used afterwards."""
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_pool(filename):
+    """Memory-maps a pool file written by `compile_pool` or `pokecat compile`."""
+    return PoolStore(filename)
@@ -0,0 +1,119 @@
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+_active_profiler = ContextVar("pokecat_active_profiler", default=None)
+
+
+class Profiler:
+    """
+    Collects per-stage call counts and timings of populate_pokeset calls,
+    as well as the total time spent per set.
+    Only calls made while the profiler is active (see `activate()`) get recorded.
+    Subclasses may override `add_stage` and `add_set` to hook into the measurements.
+    """
+
+    def __init__(self):
+        self.stages = {}  # stage name -> [calls, total seconds]
+        self.sets = []    # (identifier, total seconds)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self):
+        """Records all populate_pokeset calls in the current context while active."""
+        token = _active_profiler.set(self)
+        try:
+            yield self
+        finally:
+            _active_profiler.reset(token)
+
+    @contextmanager
+    def stage(self, name):
+        """Measures the enclosed block as a stage called `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                self.stages[name] = [1, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+
+    def add_set(self, identifier, seconds):
+        with self._lock:
+            self.sets.append((identifier, seconds))
+
+    def slowest_sets(self, amount=10):
+        return sorted(self.sets, key=lambda s: s[1], reverse=True)[:amount]
+
+    def report(self, amount_slowest=10):
+        """Returns a human readable breakdown of all stages and the slowest sets."""
+        total = sum(seconds for _, seconds in self.stages.values()) or 1.0
+        lines = ["{:<16} {:>8} {:>12} {:>12} {:>7}".format("stage", "calls", "total [ms]", "mean [µs]", "share")]
+        for name, (calls, seconds) in sorted(self.stages.items(), key=lambda s: s[1][1], reverse=True):
+            lines.append("{:<16} {:>8} {:>12.3f} {:>12.1f} {:>6.1f}%".format(
+                name, calls, seconds * 1e3, seconds / calls * 1e6, 100 * seconds / total))
+        if self.sets:
+            lines.append("")
+            lines.append("slowest sets:")
+            for identifier, seconds in self.slowest_sets(amount_slowest):
+                lines.append("{:>10.3f} ms  {}".format(seconds * 1e3, identifier))
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile():
+    """Shortcut for creating and activating a new Profiler."""
+    profiler = Profiler()
+    with profiler.activate():
+        yield profiler
+
+
+class _StageTimer:
+    __slots__ = ("profiler", "start", "last")
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, stage):
+        """Attributes the time since the last lap to `stage`."""
+        now = time.perf_counter()
+        self.profiler.add_stage(stage, now - self.last)
+        self.last = now
+
+    def finish(self, identifier):
+        self.profiler.add_set(identifier, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def lap(self, stage):
+        pass
+
+    def finish(self, identifier):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def start_timer():
+    """
+    Returns a timer recording into the currently active profiler,
+    or a timer doing nothing if no profiler is active.
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return _NULL_TIMER
+    return _StageTimer(profiler)
@@ -0,0 +1,172 @@
+
+import json
+from collections.abc import Mapping
+
+
+class _Partial:
+    """Marks a dict of which only some keys get redacted, the rest stays visible."""
+    def __init__(self, overrides):
+        self.overrides = overrides
+
+
+class _FirstOnly(_Partial):
+    """Marks a list of which only the first element is kept, with the given keys redacted."""
+
+
+_STATS = {
+    "hp": "???",
+    "atk": "???",
+    "def": "???",
+    "spA": "???",
+    "spD": "???",
+    "spe": "???",
+}
+
+_STATUS = {
+    "nonvolatile": {
+        "slp": 0,
+        "psn": False,
+        "brn": False,
+        "frz": False,
+        "par": False,
+        "tox": 0,
+    },
+    "volatile": {
+        "cnf": 0,
+        "cur": False,  # curse
+        "inf": False,  # infatuation
+        "foc": False,  # focus energy
+        "tau": False,  # taunt
+        "tor": False,  # torment
+    }
+}
+
+# the same redactions as redact_pokeset_data() does.
+# these fields are completely replaced and the same for every Pokémon
+_CONSTANTS = {
+    "displayname": "???",
+    "ingamename": "???",
+    "setname": "???",
+    "shiny": False,
+    "gender": None,
+    "form": 0,
+    "happiness": 0,
+    "level": "???",
+    "biddable": True,
+    "stats": _STATS,
+    "ivs": _STATS,
+    "evs": _STATS,
+    "rarity": 1.0,
+    "tags": [],
+    # Live data
+    "curr_hp": "???",
+    "status": _STATUS,
+}
+# these fields only get some of their keys replaced
+_PARTIALS = {
+    "ability": _Partial({"id": 0, "name": "???", "description": ""}),
+    "item": _Partial({"id": 0, "name": "???", "description": ""}),
+    "ball": _Partial({"id": 0, "name": "???", "description": ""}),
+    "nature": _Partial({"id": 0, "name": "???", "increased": None, "decreased": None}),
+    "species": _Partial({"id": 0, "name": "???", "types": ["???"], "basestats": _STATS, "color": "???"}),
+    "original_species": _Partial({"id": 0, "name": "???", "types": ["???"], "basestats": _STATS}),
+    "moves": _FirstOnly({"id": 0, "displayname": "???", "name": "???", "name_id": "???", "category": "Physical",
+                         "type": "???", "pp": 0, "pp_ups": 0, "power": 0, "accuracy": 0}),
+}
+_REDACTIONS = dict(_CONSTANTS, **_PARTIALS)
+
+# The fully redacted fields, pre-encoded as JSON object members.
+# Shared by every redacted Pokémon, see `dumps_redacted`.
+REDACTED_JSON_FRAGMENT = json.dumps(_CONSTANTS)[1:-1]
+_ENCODED_PARTIALS = {key: json.dumps(partial.overrides) for key, partial in _PARTIALS.items()}
+
+
+def _readonly(value):
+    if isinstance(value, dict):
+        return RedactedView(value, {})
+    if isinstance(value, list):
+        return tuple(_readonly(v) for v in value)
+    return value
+
+
+def _plain(value):
+    if isinstance(value, RedactedView):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_plain(v) for v in value]
+    return value
+
+
+class RedactedView(Mapping):
+    """
+    Read-only view of a Pokémon with the given fields redacted.
+    The underlying data is neither copied nor modified, nested dicts and lists
+    are returned as read-only views and tuples respectively.
+    Use `redacted_view()` to create one for an instantiated Pokémon.
+    """
+    __slots__ = ("_data", "_overrides")
+
+    def __init__(self, data, overrides):
+        self._data = data
+        self._overrides = overrides
+
+    def __getitem__(self, key):
+        override = self._overrides.get(key, self)
+        if override is self:
+            return _readonly(self._data[key])
+        if isinstance(override, _FirstOnly):
+            return tuple(RedactedView(element, override.overrides) for element in self._data[key][:1])
+        if isinstance(override, _Partial):
+            return RedactedView(self._data[key], override.overrides)
+        return _readonly(override)
+
+    def __iter__(self):
+        yield from self._data
+        for key, override in self._overrides.items():
+            if key not in self._data and not isinstance(override, _Partial):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return "RedactedView(%r)" % self.to_dict()
+
+    def to_dict(self):
+        """Returns a plain (mutable) copy of the redacted data."""
+        return {key: _plain(value) for key, value in self.items()}
+
+
+def redacted_view(pokemon):
+    """
+    Returns a read-only view of an instantiated Pokémon that looks like
+    `redact_pokeset_data()` was applied to it, without copying or modifying it.
+    """
+    return RedactedView(pokemon, _REDACTIONS)
+
+
+def _dumps_partial(data, overrides, key):
+    if data.keys() <= overrides.keys():
+        # nothing of the original data remains visible
+        return _ENCODED_PARTIALS[key]
+    return json.dumps(dict(data, **overrides))
+
+
+def dumps_redacted(pokemon):
+    """
+    Encodes an instantiated Pokémon as JSON, as if `redact_pokeset_data()` was
+    applied to it, without copying or modifying it. The fully redacted fields
+    are taken from the shared `REDACTED_JSON_FRAGMENT` instead of being encoded again.
+    """
+    members = [REDACTED_JSON_FRAGMENT]
+    for key, value in pokemon.items():
+        if key not in _REDACTIONS:
+            members.append("%s: %s" % (json.dumps(key), json.dumps(value)))
+            continue
+        redaction = _REDACTIONS[key]
+        if isinstance(redaction, _FirstOnly):
+            moves = ", ".join(_dumps_partial(move, redaction.overrides, key) for move in value[:1])
+            members.append("%s: [%s]" % (json.dumps(key), moves))
+        elif isinstance(redaction, _Partial):
+            members.append("%s: %s" % (json.dumps(key), _dumps_partial(value, redaction.overrides, key)))
+    return "{%s}" % ", ".join(members)
@@ -0,0 +1,56 @@
+
+import random
+
+
+class NumpyRandom:
+    """
+    Adapts a NumPy `Generator` to the subset of `random.Random`'s interface pokecat uses.
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def random(self):
+        return float(self.generator.random())
+
+    def randint(self, a, b):
+        return int(self.generator.integers(a, b + 1))
+
+    def choice(self, seq):
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence")
+        return seq[int(self.generator.integers(len(seq)))]
+
+    def sample(self, population, k):
+        indices = self.generator.choice(len(population), size=k, replace=False)
+        return [population[int(i)] for i in indices]
+
+
+def get_rng(rng=None):
+    """
+    Turns anything accepted as `rng` argument into an object providing
+    `random()`, `randint()`, `choice()` and `sample()` like `random.Random` does.
+
+    Arguments:
+        rng: Defaults to None, which uses the module-global `random`.
+             Can be a `random.Random` instance, a NumPy `Generator`,
+             or a seed (int, str or bytes) for a new `random.Random`.
+             Seeds produce the same results in every thread and process.
+    """
+    if rng is None:
+        return random
+    if isinstance(rng, (int, str, bytes)) and not isinstance(rng, bool):
+        return random.Random(rng)
+    if isinstance(rng, random.Random):
+        return rng
+    if hasattr(rng, "integers") and hasattr(rng, "bit_generator"):
+        return NumpyRandom(rng)
+    raise TypeError("rng must be None, a seed, a random.Random or a numpy Generator, not %s" % type(rng))
+
+
+def derive_rng(seed, *keys):
+    """
+    Creates a new `random.Random` for a specific piece of work, e.g. one set in a file,
+    so that results don't depend on the order in which the work gets done.
+    """
+    return random.Random("/".join(str(part) for part in (seed,) + keys))
@@ -0,0 +1,145 @@
+"""
+Finding near-duplicate sets in a pool, e.g. copies of a set with a single move changed.
+
+Each populated set is reduced to a set of features (species, move options,
+items, abilities, natures and EVs), whose Jaccard similarity tells how alike
+two sets are. Instead of comparing all pairs, sets get MinHash signatures
+which are bucketed with locality-sensitive hashing (LSH), and only sets
+sharing a bucket are compared. This takes roughly linear time in the pool size.
+"""
+
+import random
+import zlib
+from collections import namedtuple, defaultdict
+
+
+# a Mersenne prime larger than any 32 bit hash
+_PRIME = (1 << 61) - 1
+
+Cluster = namedtuple("Cluster", ["members", "pairs"])
+
+
+def _options(value):
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _name(value):
+    return value["name"] if isinstance(value, dict) else value
+
+
+def set_features(pokeset):
+    """Returns the features of a populated set near-duplicate detection compares by, as a frozenset of strings."""
+    features = {"species:%s" % pokeset["species"]["name"]}
+    for slot in pokeset["moves"]:
+        features.update("move:%s" % _name(move) for move in _options(slot))
+    for field in ("item", "ability", "nature"):
+        features.update("%s:%s" % (field, _name(option)) for option in _options(pokeset[field]))
+    features.update("evs:%s:%s" % (stat, value) for stat, value in pokeset["evs"].items())
+    return frozenset(features)
+
+
+def jaccard(features1, features2):
+    """Returns the Jaccard similarity of two feature sets."""
+    if not features1 and not features2:
+        return 1.0
+    return len(features1 & features2) / len(features1 | features2)
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of `num_perm` values for feature sets.
+    The fraction of equal values of two signatures estimates the Jaccard similarity of their feature sets.
+    """
+
+    def __init__(self, num_perm=64, seed=0):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._coefficients = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        # features like moves or species recur across a pool, so their hashes are computed once
+        self._hashes = {}
+
+    def _feature_hashes(self, feature):
+        hashes = self._hashes.get(feature)
+        if hashes is None:
+            h = zlib.crc32(feature.encode("utf-8"))
+            hashes = self._hashes[feature] = [(a * h + b) % _PRIME for a, b in self._coefficients]
+        return hashes
+
+    def signature(self, features):
+        if not features:
+            return (_PRIME,) * self.num_perm
+        return tuple(map(min, zip(*map(self._feature_hashes, features))))
+
+
+def lsh_parameters(threshold, num_perm, recall=0.99):
+    """
+    Returns the number of (bands, rows per band) to split signatures of length `num_perm` into.
+    Sets of similarity s share a bucket with probability 1-(1-s^rows)^bands. The most rows per band,
+    and so the fewest dissimilar sets compared, are chosen for which sets at `threshold` still
+    share a bucket with at least probability `recall`. Leftover signature values are unused.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands < recall:
+            break
+        best = (bands, rows)
+    return best
+
+
+def find_near_duplicates(pokesets, threshold=0.8, num_perm=64, seed=0):
+    """
+    Finds clusters of similar sets in a pool of populated sets.
+
+    Arguments:
+        pokesets: list of populated sets.
+        threshold: Defaults to 0.8. Minimum Jaccard similarity of the features
+                   (see `set_features`) of two sets to be considered near-duplicates.
+        num_perm: Defaults to 64. Length of the MinHash signatures.
+                  Longer signatures miss fewer near-duplicates, but take longer to compute.
+        seed: Defaults to 0. Seed for the hash functions.
+    Returns:
+        A list of Clusters, ordered by their first member. `members` is the sorted
+        list of indexes of the sets in the cluster, `pairs` a list of (index1, index2, similarity)
+        of the near-duplicate pairs which were found and connect the cluster.
+        Since LSH is probabilistic, a near-duplicate pair can occasionally be missed,
+        pairs at `threshold` with a probability of about 1%, more similar ones less likely.
+    """
+    hasher = MinHasher(num_perm, seed)
+    bands, rows = lsh_parameters(threshold, num_perm)
+    features = [set_features(pokeset) for pokeset in pokesets]
+    buckets = defaultdict(list)
+    for index, feature_set in enumerate(features):
+        signature = hasher.signature(feature_set)
+        for band in range(bands):
+            buckets[band, signature[band*rows:(band+1)*rows]].append(index)
+
+    checked = set()
+    parents = list(range(len(pokesets)))
+
+    def root(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    pairs = []
+    for members in buckets.values():
+        for i, index1 in enumerate(members):
+            for index2 in members[i+1:]:
+                if (index1, index2) in checked:
+                    continue
+                checked.add((index1, index2))
+                similarity = jaccard(features[index1], features[index2])
+                if similarity >= threshold:
+                    parents[root(index2)] = root(index1)
+                    pairs.append((index1, index2, similarity))
+
+    clusters = {}
+    for index in range(len(pokesets)):
+        clusters.setdefault(root(index), Cluster([], [])).members.append(index)
+    for pair in sorted(pairs):
+        clusters[root(pair[0])].pairs.append(pair)
+    return sorted((c for c in clusters.values() if len(c.members) > 1), key=lambda c: c.members[0])
@@ -0,0 +1,130 @@
+"""
+Type effectiveness as an 18x18 matrix indexed by objects.Type numbers,
+and coverage scoring for sets and teams built on top of it.
+The vectorized team scoring requires numpy.
+"""
+
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from .globaldata import TYPES, TYPE_EFFECTIVENESS
+from .objects import Type
+
+
+TYPE_NUMBERS = {name: number for number, name in enumerate(TYPES)}
+assert all(Type[name] == number for name, number in TYPE_NUMBERS.items())
+
+# EFFECTIVENESS[attacking][defending] is the damage multiplier
+EFFECTIVENESS = tuple(
+    tuple(float(TYPE_EFFECTIVENESS.get(attacking, {}).get(defending, 1.0)) for defending in TYPES)
+    for attacking in TYPES
+)
+
+TeamScores = namedtuple("TeamScores", ["offense", "stacked_weaknesses"])
+
+
+def get_type(type_):
+    """Returns the objects.Type for a type name or number, or None for unknown types like "???"."""
+    if isinstance(type_, int):
+        return Type(type_) if 0 <= type_ < len(TYPES) else None
+    number = TYPE_NUMBERS.get(type_)
+    return None if number is None else Type(number)
+
+
+def get_effectiveness(attacking, defending):
+    """
+    Returns the damage multiplier of an attacking type against one or more defending types.
+    Types can be names or numbers. Unknown types are neutral.
+    """
+    attacking = get_type(attacking)
+    if isinstance(defending, (str, int)):
+        defending = [defending]
+    multiplier = 1.0
+    for type_ in defending:
+        type_ = get_type(type_)
+        if attacking is not None and type_ is not None:
+            multiplier *= EFFECTIVENESS[attacking][type_]
+    return multiplier
+
+
+def _damaging_moves(pokeset):
+    for move in pokeset["moves"]:
+        # populated sets have lists of options per slot
+        for option in (move if isinstance(move, list) else [move]):
+            if option and option["category"] != "Status":
+                yield option
+
+
+def move_type_mask(pokeset):
+    """
+    Returns a bitmask of the types of the damaging moves of a populated or instantiated set,
+    with bit n being set for the type with number n. For populated sets, all options count.
+    """
+    mask = 0
+    for move in _damaging_moves(pokeset):
+        type_ = get_type(move["type"])
+        if type_ is not None:
+            mask |= 1 << type_
+    return mask
+
+
+def coverage_mask(pokeset):
+    """
+    Returns a bitmask of the defending types the damaging moves of a populated or
+    instantiated set hit super effectively, with bit n standing for the type with number n.
+    """
+    mask = 0
+    types = move_type_mask(pokeset)
+    for attacking, matchups in enumerate(EFFECTIVENESS):
+        if types & (1 << attacking):
+            for defending, multiplier in enumerate(matchups):
+                if multiplier > 1:
+                    mask |= 1 << defending
+    return mask
+
+
+def weakness_vector(types):
+    """Returns the multipliers of all attacking types, ordered by number, against the given types."""
+    return [get_effectiveness(attacking, types) for attacking in range(len(TYPES))]
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("pokecat's vectorized team scoring requires numpy to be installed")
+
+
+def effectiveness_array():
+    """Returns EFFECTIVENESS as a float numpy array of shape (18, 18)."""
+    _require_numpy()
+    return np.array(EFFECTIVENESS, dtype=np.float64)
+
+
+def score_teams(pokesets, teams):
+    """
+    Scores many candidate teams made from a pool of sets at once.
+
+    Arguments:
+        pokesets: the pool, a list of populated or instantiated sets.
+        teams: int array-like of shape (number of teams, team size)
+               containing indexes into `pokesets`.
+    Returns:
+        TeamScores with int arrays with one entry per team:
+        `offense` is the number of types the team's moves hit super effectively,
+        `stacked_weaknesses` counts, summed over all attacking types,
+        how many team members beyond the first are weak to that type.
+    """
+    _require_numpy()
+    teams = np.asarray(teams, dtype=np.intp)
+    coverage = np.array([coverage_mask(p) for p in pokesets], dtype=np.uint32)
+    weak = np.array([[m > 1 for m in weakness_vector(p["species"]["types"])] for p in pokesets],
+                    dtype=np.int32).reshape(len(pokesets), len(TYPES))
+    team_coverage = np.bitwise_or.reduce(coverage[teams], axis=1)
+    bits = (team_coverage[:, None] >> np.arange(len(TYPES), dtype=np.uint32)) & 1
+    offense = bits.sum(axis=1)
+    weak_counts = weak[teams].sum(axis=1)
+    stacked_weaknesses = np.maximum(weak_counts - 1, 0).sum(axis=1)
+    return TeamScores(offense=offense, stacked_weaknesses=stacked_weaknesses)
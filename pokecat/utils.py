@@ -1,5 +1,8 @@
 import re
+import sys
 from contextlib import suppress
+from functools import lru_cache
+from operator import itemgetter
 
 from .objects import (Species, Stats, Nature, Item,
                       Ability, Pokemon, Move)
@@ -35,14 +38,15 @@ TYPES = [
     "Fairy",
 ]
 
+_TYPE_NUMBERS = {type_: number for number, type_ in enumerate(TYPES)}
+
+
 def get_type_number(type_):
-    if type_ in TYPES:
-        return TYPES.index(type_)
-    return -1
+    return _TYPE_NUMBERS.get(type_, -1)
 
 
 def get_category_number(category):
-    if category == "Phsyical":
+    if category == "Physical":
         return 0
     if category == "Special":
         return 1
@@ -90,6 +94,95 @@ def construct_pokemon_from_dict(data):
     return Pokemon(**data)
 
 
+@lru_cache(maxsize=None)
+def _field_defaults(cls):
+    # the defaults are set after the namedtuples' creation, so _field_defaults doesn't know them
+    defaults = cls.__new__.__defaults__ or ()
+    return dict(zip(cls._fields[len(cls._fields) - len(defaults):], defaults))
+
+
+@lru_cache(maxsize=None)
+def _field_getter(cls):
+    return itemgetter(*cls._fields)
+
+
+_POKEMON_FIELDS = frozenset(Pokemon._fields)
+_STATS_FIELDS = frozenset(("ivs", "evs", "stats"))
+_SIMPLE_FIELDS = {"nature": Nature, "item": Item, "ball": Item, "ability": Ability}
+
+
+class PokemonInterner:
+    """
+    Converts instantiated Pokémon from dicts into objects.Pokemon like
+    `construct_pokemon_from_dict` does, but without modifying the input and
+    sharing equal immutable parts (species, moves, items, natures, stats, ...)
+    between all Pokémon converted by the same interner.
+    Keys the objects don't have a field for (e.g. a species' color) are ignored.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def _intern(self, key):
+        # key is (class, *field values)
+        thing = self._cache.get(key)
+        if thing is None:
+            thing = self._cache[key] = key[0](*key[1:])
+        return thing
+
+    def stats(self, data):
+        return self._intern((Stats, data["hp"], data["atk"], data["def"], data["spA"], data["spD"], data["spe"]))
+
+    def _simple(self, cls, data):
+        try:
+            values = _field_getter(cls)(data)
+        except KeyError:
+            defaults = _field_defaults(cls)
+            values = tuple([data.get(field, defaults.get(field)) for field in cls._fields])
+        return self._intern((cls,) + values)
+
+    def species(self, data):
+        return self._intern((Species, data["id"], data["name"], self.stats(data["basestats"]), tuple(data["types"])))
+
+    def move(self, data):
+        return self._simple(Move, data)
+
+    def moves(self, data):
+        moves = tuple([self.move(move) if move else move for move in data])
+        return self._cache.setdefault(moves, moves)
+
+    def pokemon(self, data):
+        fields = {}
+        for key, value in data.items():
+            if key not in _POKEMON_FIELDS:
+                continue
+            if not value:
+                fields[key] = value
+            elif key in _STATS_FIELDS:
+                fields[key] = self.stats(value)
+            elif key in _SIMPLE_FIELDS:
+                fields[key] = self._simple(_SIMPLE_FIELDS[key], value)
+            elif key == "species":
+                fields[key] = self.species(value)
+            elif key == "moves":
+                fields[key] = self.moves(value)
+            elif isinstance(value, str):
+                fields[key] = sys.intern(value)
+            else:
+                fields[key] = value
+        return Pokemon(**fields)
+
+
+def construct_pokemons_from_dicts(datas, interner=None):
+    """
+    Converts many instantiated Pokémon from dicts into objects.Pokemon, see PokemonInterner.
+    Pass the same interner to multiple calls to share objects between them too.
+    """
+    if interner is None:
+        interner = PokemonInterner()
+    return [interner.pokemon(data) for data in datas]
+
+
 POKEMON_NAME_NORMALIZATIONS = {
     "nidoran♂": "nidoran-m",
     "nidoran♀": "nidoran-f",
@@ -1,6 +1,7 @@
 
 import json
 import os
+import tempfile
 import unittest
 import warnings
 from copy import deepcopy
@@ -514,6 +515,123 @@ class PokecatTester(unittest.TestCase):
             else:
                 self.assertTrue(False)
 
+    def test_impossible_restrictions(self):
+        doc = load_test_doc("_template")
+        doc["moves"] = ["Pound", "Surf"]
+        doc["separations"] = [["Pound", "Surf"]]
+        with self.assertRaisesRegex(ValueError, r"combinations and separations don't allow for any valid instance"):
+            pokecat.populate_pokeset(doc)
+
+    def test_unlikely_restrictions(self):
+        doc = load_test_doc("_template")
+        doc["moves"] = ["Pound"]
+        doc["item"] = list(range(100, 201))
+        doc["combinations"] = [["Pound", pokecat.gen4data.ITEMS[100]["name"]]]
+        with self.assertWarnsRegex(UserWarning, r"Only 1 of 101 possible instances \(0.99%\) respect"):
+            pokecat.populate_pokeset(doc)
+
+    def test_restriction_analysis(self):
+        doc = load_test_doc("_template")
+        doc["moves"] = [["Pound", "Aqua Jet"], ["Surf", "Rock Smash", "Tackle"]]
+        doc["gender"] = ["m", "f"]
+        doc["combinations"] = [["Pound", "Surf"]]
+        pokeset = pokecat.populate_pokeset(doc)
+        analysis = pokecat.analyze_restrictions(pokeset)
+        # Pound+Surf, Aqua Jet+Rock Smash, Aqua Jet+Tackle, each for both genders
+        self.assertEqual(analysis.valid_count, 6)
+        self.assertEqual(analysis.possible_count, 12)
+        self.assertAlmostEqual(analysis.valid_fraction, 0.5)
+        marginals = analysis.marginals
+        self.assertEqual(marginals["moves"][0], [1/3, 2/3])
+        self.assertEqual(marginals["moves"][1], [1/3, 1/3, 1/3])
+        self.assertEqual(marginals["gender"], [0.5, 0.5])
+        self.assertEqual(marginals["item"], [1.0])
+
+    def test_profiling(self):
+        doc = load_test_doc("_template")
+        pokecat.populate_pokeset(doc)  # no active profiler, nothing recorded
+        with pokecat.profiling.profile() as profiler:
+            pokecat.populate_pokeset(doc)
+            pokecat.populate_pokeset(doc)
+        pokecat.populate_pokeset(doc)
+        for stage in ("species", "moves", "nature", "forms", "stats", "tags", "combinations"):
+            self.assertEqual(profiler.stages[stage][0], 2)
+        self.assertEqual([identifier for identifier, _ in profiler.sets], ["Bulbasaur Standard"] * 2)
+        self.assertIn("slowest sets:", profiler.report())
+
+    def test_diagnostics(self):
+        doc = load_test_doc("_template")
+        doc["species"] = "Groundon"
+        doc["evs"] = {"hp": 15, "atk": 0, "def": 0, "spA": 0, "spD": 0, "spe": 0}
+        doc["moves"] = ["Tackle", "Tackle"]
+        diagnostics = pokecat.Diagnostics()
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            pokecat.populate_pokeset(doc, diagnostics=diagnostics)
+            self.assertEqual(len(w), 0)
+        codes = [d.code for d in diagnostics]
+        self.assertEqual(codes, [pokecat.DiagnosticCode.AUTOCORRECTED, pokecat.DiagnosticCode.DUPLICATE_MOVES])
+        autocorrection = diagnostics.with_code(pokecat.DiagnosticCode.AUTOCORRECTED)[0]
+        self.assertEqual(autocorrection.fields, {"field": "species", "given": "Groundon", "assumed": "Groudon"})
+        self.assertEqual(autocorrection.message, "Didn't recognize species Groundon, but assumed Groudon.")
+
+    def test_diagnostics_invalid_evs(self):
+        doc = load_test_doc("_template")
+        doc["evs"] = {"hp": 253, "atk": 0, "def": 0, "spA": 0, "spD": 0, "spe": 0}
+        diagnostics = pokecat.Diagnostics()
+        pokecat.populate_pokeset(doc, skip_ev_check=True, diagnostics=diagnostics)
+        invalid = diagnostics.with_code(pokecat.DiagnosticCode.INVALID_EVS)
+        self.assertEqual(len(invalid), 1)
+        self.assertEqual(invalid[0].fields["evs"]["hp"], 253)
+
+    def test_seeded_instantiation(self):
+        import random
+        doc = load_test_doc("_template")
+        doc["moves"] = [["Pound", "Aqua Jet", "Surf"], ["Rock Smash", "Tackle", "Ember"]]
+        doc["item"] = ["Leftovers", "Choice Band", "Black Belt"]
+        doc["gender"] = ["m", "f"]
+        pokeset = pokecat.populate_pokeset(doc)
+        results = [pokecat.instantiate_pokeset(pokeset, rng=seed) for seed in range(20)]
+        self.assertEqual(results, [pokecat.instantiate_pokeset(pokeset, rng=seed) for seed in range(20)])
+        self.assertEqual(results[7], pokecat.instantiate_pokeset(pokeset, rng=random.Random(7)))
+        self.assertGreater(len(set(json.dumps(r, sort_keys=True) for r in results)), 1)
+
+    def test_seeded_random_pokemon(self):
+        self.assertEqual(pokecat.generate_random_pokemon(rng="match-1"),
+                         pokecat.generate_random_pokemon(rng="match-1"))
+
+    def test_numpy_generator(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        pokeset = pokecat.generate_random_pokeset(rng=numpy.random.default_rng(3))
+        self.assertEqual(pokeset, pokecat.generate_random_pokeset(rng=numpy.random.default_rng(3)))
+        pokemon = pokecat.instantiate_pokeset(pokeset, rng=numpy.random.default_rng(3))
+        self.assertEqual(pokemon, pokecat.instantiate_pokeset(pokeset, rng=numpy.random.default_rng(3)))
+
+    def test_redacted_view(self):
+        doc = load_test_doc("_template")
+        doc["moves"] = ["Pound", "Surf"]
+        doc["gender"] = "f"
+        pokemon = pokecat.instantiate_pokeset(pokecat.populate_pokeset(doc), rng=1)
+        pokemon["original_species"] = deepcopy(pokemon["species"])
+        backup = deepcopy(pokemon)
+        expected = deepcopy(pokemon)
+        pokecat.redact_pokeset_data(expected)
+        view = pokecat.redacted_view(pokemon)
+        self.assertEqual(view.to_dict(), expected)
+        self.assertEqual(view["species"]["name"], "???")
+        self.assertEqual(view["species"]["gender_ratios"], pokemon["species"]["gender_ratios"])
+        self.assertEqual(len(view["moves"]), 1)
+        with self.assertRaises(TypeError):
+            view["setname"] = "foo"
+        with self.assertRaises(TypeError):
+            view["status"]["volatile"]["cnf"] = 1
+        self.assertEqual(json.loads(pokecat.dumps_redacted(pokemon)), expected)
+        self.assertIn(pokecat.REDACTED_JSON_FRAGMENT, pokecat.dumps_redacted(pokemon))
+        self.assertEqual(pokemon, backup, "redacting a view modified the original")
+
     def test_skip_ev_check_single(self):
         doc = load_test_doc("_template")
         doc["evs"] = {"atk": 0, "def": 0, "spA": 0, "spD": 0, "spe": 0}
@@ -607,6 +725,41 @@ class PokecatTester(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, r"tags must be a list of strings"):
             pokecat.populate_pokeset(doc)
 
+    def test_form_adjustments(self):
+        doc = load_test_doc("_template")
+        doc["species"] = "Deoxys"
+        doc["form"] = "Attack"
+        result = pokecat.populate_pokeset(doc)
+        self.assertEqual(result["displayname"], "Deoxys Attack")
+        self.assertEqual(result["species"]["basestats"]["atk"], 180)
+        self.assertEqual(result["stats"]["atk"], pokecat.stats.calculate_stat(
+            180, result["evs"]["atk"], result["ivs"]["atk"], "atk", result["nature"], 100))
+        doc["species"] = "Wormadam"
+        doc["form"] = 2
+        doc["displayname"] = "Trashy"
+        result = pokecat.populate_pokeset(doc)
+        self.assertEqual(result["displayname"], "Trashy")
+        self.assertEqual(result["species"]["types"], ["Bug", "Steel"])
+        self.assertEqual(result["species"]["color"], "Pink")
+        del doc["displayname"]
+        doc["form"] = 0
+        doc["species"] = "Arceus"
+        doc["item"] = "Flame Plate"
+        result = pokecat.populate_pokeset(doc)
+        self.assertEqual(result["displayname"], "Arceus Fire")
+        self.assertEqual(result["species"]["types"], ["Fire"])
+        self.assertEqual(result["species"]["color"], "Red")
+        doc["item"] = ["Flame Plate", "Splash Plate"]
+        with self.assertRaisesRegex(ValueError, r"Arceus currently must have a fixed item"):
+            pokecat.populate_pokeset(doc)
+        # adjusted species are computed once and shared, populated sets get copies
+        gen = pokecat.get_generation(4)
+        species, formname = gen.form_species(493, 0, "Flame Plate")
+        self.assertIs(gen.form_species(493, 0, "Flame Plate")[0], species)
+        self.assertEqual(formname, "Fire")
+        self.assertIsNot(result["species"], species)
+        self.assertIs(gen.form_species(6)[0], gen.pokedex[6])
+
     # todo test forms, displaynames with forms, moves, special cases, combinations and separations.
     # and whatever isn't tested yet as well
 
@@ -627,6 +780,559 @@ class PokecatTester(unittest.TestCase):
         self.assertEqual(gen1_100["id"], 100)
         self.assertEqual(gen4_100["id"], 100)
 
+    def test_generation_registry(self):
+        gen4 = pokecat.get_generation(4)
+        self.assertIs(pokecat.get_generation(), gen4)
+        self.assertIs(pokecat.gen4data.GENERATION, gen4)
+        self.assertEqual(gen4.get_move("Teleport")["id"], 100)
+        self.assertEqual(gen4.get_ball("Master")["name"], "Master Ball")
+        self.assertEqual(gen4.find_pokemon("Groundon")[383]["name"], "Groudon")
+        self.assertIsNone(gen4.get_item("Definitely Not An Item"))
+        for item in gen4.items:
+            self.assertIs(gen4.get_item(item["id"]), pokecat.datautils.get_exact(gen4.items, item["id"]))
+            self.assertIs(gen4.get_item(item["name"]), pokecat.datautils.get_exact(gen4.items, item["name"]))
+        with self.assertRaisesRegex(ValueError, r"Unsupported generation: 9"):
+            pokecat.get_generation(9)
+
+    def test_generation_lazy_loading(self):
+        gen1 = pokecat.get_generation(1)
+        gen1.get_item("HM05")
+        gen = gen1.fresh()
+        self.assertIsNot(gen, gen1)
+        self.assertEqual(gen.number, 1)
+        self.assertIn("items", gen.table_names())
+        self.assertFalse(gen.is_loaded("items"))
+        self.assertEqual(gen.get_item("HM05")["id"], 200)
+        self.assertTrue(gen.is_loaded("items"))
+        self.assertFalse(gen.is_loaded("moves"))
+
+    def test_populate_generation(self):
+        doc = load_test_doc("_template")
+        result = pokecat.populate_pokeset(doc, generation=4)
+        self.assertEqual(result, pokecat.populate_pokeset(doc))
+        with self.assertRaisesRegex(ValueError, r"Generation 1 has no pokedex data"):
+            pokecat.populate_pokeset(doc, generation=1)
+
+    def test_construct_pokemons_interned(self):
+        doc = load_test_doc("_template")
+        doc["moves"] = ["Pound", "Surf"]
+        doc["item"] = "Leftovers"
+        pokeset = pokecat.populate_pokeset(doc)
+        instances = [pokecat.instantiate_pokeset(pokeset, rng=i) for i in range(3)]
+        backup = deepcopy(instances)
+        pokemons = pokecat.utils.construct_pokemons_from_dicts(instances)
+        self.assertEqual(instances, backup, "converting modified the input")
+        first, second = pokemons[0], pokemons[1]
+        self.assertEqual(first.species.name, "Bulbasaur")
+        self.assertEqual(first.species.basestats.def_, 49)
+        self.assertEqual(first.item.name, "Leftovers")
+        self.assertEqual(first.nature.name, "Lonely")
+        self.assertEqual([m.name_id for m in first.moves], ["pound", "surf"])
+        self.assertIs(first.species, second.species)
+        self.assertIs(first.moves, second.moves)
+        self.assertIs(first.ivs, first.evs)  # both all zeros
+        self.assertEqual(first.id, (1, "Standard"))
+
+    def test_normalized_species_index(self):
+        calls = []
+        def normalize(name):
+            calls.append(name)
+            return pokecat.utils.normalize_name(name)
+        tables = dict(pokecat.get_generation(4)._tables)
+        tables["pokedex"] = pokecat.generations.Table(tables["pokedex"].loader, normalize=normalize)
+        gen = pokecat.Generation(4, tables)
+        self.assertEqual(list(gen.find_pokemon("Groundon")), [383])
+        calls.clear()
+        for name in ("Groundon", "Charizrd", "mr.mime", "nidoran(f)"):
+            expected = pokecat.datautils.find_similar(gen.pokedex, normalize(name),
+                                                      namegetter=lambda n: normalize(n["name"]))
+            calls.clear()
+            self.assertEqual(gen.find_pokemon(name), expected)
+            self.assertEqual(calls, [name])
+
+    def test_autocomplete(self):
+        complete = pokecat.autocomplete.complete
+        names = complete("moves", "thunder")
+        self.assertEqual(names[0], "Thunder")
+        self.assertIn("Thunderbolt", names)
+        self.assertEqual(complete("moves", "THUNDER w"), ["Thunder Wave"])
+        self.assertIn("Thunder Wave", complete("moves", "wave"))
+        self.assertEqual(complete("species", "mr. m"), ["Mr. Mime"])
+        self.assertEqual(len(complete("abilities", "s", limit=3)), 3)
+        self.assertEqual(complete("items", "poke b")[0], "Poké Ball")
+        self.assertEqual(complete("moves", "xyzxyz"), [])
+        with self.assertRaisesRegex(ValueError, r"Cannot complete pokemon"):
+            complete("pokemon", "a")
+        # completions must be accepted when populating
+        doc = load_test_doc("_template")
+        doc["species"] = complete("species", "groud")[0]
+        doc["moves"] = [complete("moves", "thunder")[0]]
+        doc["item"] = complete("items", "leftov")[0]
+        doc["ability"] = complete("abilities", "overgr")[0]
+        doc["nature"] = complete("natures", "mod")[0]
+        doc["ball"] = complete("balls", "mas")[0]
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            pokecat.populate_pokeset(doc)
+            self.assertEqual(len(w), 0)
+
+    def test_damage_matrix(self):
+        try:
+            from pokecat import damage
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        attacker = load_test_doc("_template")
+        attacker["species"] = "Blastoise"
+        attacker["moves"] = ["Surf", "Earthquake", "Toxic", "Ice Beam"]
+        attacker["ivs"] = 31
+        defender = load_test_doc("_template")
+        defender["species"] = "Charizard"
+        defender["ivs"] = 31
+        attacker = pokecat.instantiate_pokeset(pokecat.populate_pokeset(attacker))
+        defender = pokecat.instantiate_pokeset(pokecat.populate_pokeset(defender))
+        matrix = damage.damage_matrix([attacker, defender], chunk_size=1)
+        self.assertEqual(matrix.maximum.shape, (2, 4, 2))
+        # Surf vs Charizard: STAB and super effective
+        level_factor = 2 * 100 // 5 + 2
+        base = level_factor * 95 * attacker["stats"]["spA"] // 50 // defender["stats"]["spD"] + 2
+        expected_max = base * 3 // 2 * 2
+        expected_min = base * 85 // 100 * 3 // 2 * 2
+        hp = defender["stats"]["hp"]
+        self.assertAlmostEqual(matrix.maximum[0, 0, 1], expected_max / hp * 100, places=4)
+        self.assertAlmostEqual(matrix.minimum[0, 0, 1], expected_min / hp * 100, places=4)
+        self.assertEqual(matrix.maximum[0, 1, 1], 0)  # Earthquake vs Flying
+        self.assertEqual(matrix.maximum[0, 2, 1], 0)  # Toxic is a status move
+        self.assertTrue(matrix.move_mask[0].all())
+        self.assertEqual(matrix.move_mask[1].tolist(), [True, False, False, False])
+        offense, defense = damage.balance_scores([attacker, defender])
+        self.assertEqual(offense.shape, (2,))
+
+    def test_typechart(self):
+        from pokecat import typechart
+        from pokecat.objects import Type
+        self.assertEqual(len(typechart.EFFECTIVENESS), 18)
+        self.assertEqual(typechart.EFFECTIVENESS[Type.Water][Type.Fire], 2.0)
+        self.assertEqual(typechart.get_effectiveness("Ground", ["Fire", "Flying"]), 0.0)
+        self.assertEqual(typechart.get_effectiveness("Rock", ["Fire", "Flying"]), 4.0)
+        self.assertEqual(typechart.get_effectiveness("Fire", "???"), 1.0)
+        self.assertEqual(pokecat.utils.get_type_number("Dark"), Type.Dark)
+        self.assertEqual(typechart.weakness_vector(["Fire", "Flying"])[Type.Rock], 4.0)
+        doc = load_test_doc("_template")
+        doc["moves"] = [["Surf", "Thunderbolt"], "Toxic"]
+        populated = pokecat.populate_pokeset(doc)
+        self.assertEqual(typechart.move_type_mask(populated), (1 << Type.Water) | (1 << Type.Electric))
+        coverage = typechart.coverage_mask(populated)
+        for type_ in (Type.Fire, Type.Ground, Type.Rock, Type.Water, Type.Flying):
+            self.assertTrue(coverage & (1 << type_), type_)
+        self.assertFalse(coverage & (1 << Type.Grass))
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        charizard = load_test_doc("_template")
+        charizard["species"] = "Charizard"
+        charizard["moves"] = ["Flamethrower"]
+        pool = [populated, pokecat.populate_pokeset(charizard)]
+        scores = typechart.score_teams(pool, [[0, 1], [1, 1]])
+        self.assertEqual(scores.offense[0], bin(coverage | typechart.coverage_mask(pool[1])).count("1"))
+        # two Charizards share their weaknesses to Water, Electric and (doubly) Rock
+        self.assertEqual(scores.stacked_weaknesses.tolist(), [0, 3])
+
+    def test_compiled_pool(self):
+        from pokecat import poolstore
+        pool = []
+        for species in ("Seel", "Pikachu", "Deoxys"):
+            doc = load_test_doc("_template")
+            doc["species"] = species
+            doc["shiny"] = species == "Pikachu"
+            doc["rarity"] = 0.5
+            pool.append(pokecat.populate_pokeset(doc))
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "pool.bin")
+            self.assertEqual(poolstore.compile_pool(pool, filename), 3)
+            with poolstore.open_pool(filename) as store:
+                self.assertEqual(len(store), 3)
+                self.assertEqual(list(store), pool)
+                self.assertEqual(store[-1], pool[-1])
+                self.assertEqual(store.column("rarity").tolist(), [0.5] * 3)
+                self.assertEqual(store.column("species.id").tolist(), [86, 25, 386])
+                self.assertEqual(store.column("flags")[1] & 1, 1)
+                with self.assertRaises(KeyError):
+                    store.column("moves")
+            with open(filename, "wb") as f:
+                f.write(b"not a pool")
+            with self.assertRaisesRegex(ValueError, "not a compiled pokecat pool"):
+                poolstore.open_pool(filename)
+
+    def test_load_pool(self):
+        from pokecat import pool
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, "b"))
+            seel = load_test_doc("_template")
+            seel["species"] = "Seel"
+            pikachu = load_test_doc("_template")
+            pikachu["species"] = "Pikachu"
+            invalid = load_test_doc("_template")
+            invalid["species"] = "Pikachu"
+            invalid["setname"] = "Invalid"
+            invalid["level"] = 9001
+            with open(os.path.join(directory, "a.yaml"), "w", encoding="utf-8") as f:
+                yaml.safe_dump_all([seel, pikachu], f)
+            with open(os.path.join(directory, "b", "c.yaml"), "w", encoding="utf-8") as f:
+                yaml.safe_dump_all([invalid, seel], f)
+            with open(os.path.join(directory, "d.yaml"), "w", encoding="utf-8") as f:
+                yaml.safe_dump({"species": "Pikachu"}, f)
+            with open(os.path.join(directory, "e.json"), "w", encoding="utf-8") as f:
+                f.write("{not json")
+            for processes in (1, 2):
+                result = pool.load_pool(directory, processes=processes)
+                self.assertEqual([entry.pokeset["species"]["name"] for entry in result.entries], ["Seel", "Pikachu"])
+                self.assertEqual([error.source for error in result.errors],
+                                 [(os.path.join(directory, "b", "c.yaml"), 0),
+                                  (os.path.join(directory, "d.yaml"), 0),
+                                  (os.path.join(directory, "e.json"), None)])
+                self.assertEqual(result.errors[1].identifier, "Pikachu None")
+                self.assertIn("missing obligatory fields", result.errors[1].message)
+                self.assertEqual(len(result.duplicates), 1)
+                duplicate = result.duplicates[0]
+                self.assertEqual(duplicate.set_id, (86, seel["setname"]))
+                self.assertEqual(duplicate.first, (os.path.join(directory, "a.yaml"), 0))
+                self.assertEqual(duplicate.duplicate, (os.path.join(directory, "b", "c.yaml"), 1))
+
+    def test_near_duplicates(self):
+        from pokecat import similarity
+        pool = [pokecat.generate_random_pokeset(rng=seed) for seed in range(200)]
+        clone = deepcopy(pool[3])
+        clone["setname"] = "Copy"
+        clone["moves"][0] = pool[4]["moves"][0]
+        pool.append(clone)
+        pool.append(deepcopy(pool[10]))
+        expected = similarity.jaccard(similarity.set_features(pool[3]), similarity.set_features(clone))
+        self.assertGreater(expected, 0.7)
+        clusters = similarity.find_near_duplicates(pool, threshold=0.7)
+        self.assertEqual([cluster.members for cluster in clusters], [[3, 200], [10, 201]])
+        self.assertEqual(clusters[0].pairs, [(3, 200, expected)])
+        self.assertEqual(clusters[1].pairs, [(10, 201, 1.0)])
+
+    def test_near_duplicates_recall(self):
+        from pokecat import similarity
+        pool = [pokecat.generate_random_pokeset(rng=seed) for seed in range(200)]
+        clones = []
+        for index, pokeset in enumerate(pool[:200]):
+            clone = deepcopy(pokeset)
+            clone["moves"][-1] = pool[index - 1]["moves"][-1]
+            if similarity.jaccard(similarity.set_features(pokeset), similarity.set_features(clone)) >= 0.8:
+                clones.append((index, len(pool)))
+                pool.append(clone)
+        self.assertGreater(len(clones), 150)
+        found = {(pair[0], pair[1]) for cluster in similarity.find_near_duplicates(pool) for pair in cluster.pairs}
+        missed = [pair for pair in clones if pair not in found]
+        self.assertLessEqual(len(missed), len(clones) // 50, "missed one-move clones: %s" % missed)
+
+    def test_random_pokeset_direct(self):
+        balls = {ball["id"] for ball in pokecat.gen4data.BALLS}
+        for seed in range(200):
+            pokeset = pokecat.generate_random_pokeset(rng=seed)
+            ratios = pokeset["species"]["gender_ratios"] or {None: 1.0}
+            self.assertIn(pokeset["gender"][0], ratios)
+            self.assertIn(pokeset["ball"][0]["id"], balls)
+            self.assertNotIn(pokeset["item"][0]["id"], balls)
+        # the same as populating the equivalent set from names
+        raw = {
+            "species": pokeset["species"]["name"],
+            "setname": pokeset["setname"],
+            "ability": pokeset["ability"][0]["name"],
+            "nature": pokeset["nature"]["name"],
+            "ivs": pokeset["ivs"],
+            "evs": pokeset["evs"],
+            "moves": [slot[0]["name"] for slot in pokeset["moves"]],
+            "shiny": pokeset["shiny"],
+            "item": pokeset["item"][0]["name"],
+            "gender": pokeset["gender"][0],
+            "ball": pokeset["ball"][0]["name"][:-len(" Ball")],
+        }
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.assertEqual(pokecat.populate_pokeset(raw), pokeset)
+
+    def test_generate_corpus(self):
+        from io import StringIO
+        from pokecat import corpus
+        serial = list(corpus.generate_corpus("pokemon", 7, seed="corpus", processes=1, shard_size=3))
+        parallel = list(corpus.generate_corpus("pokemon", 7, seed="corpus", processes=2, shard_size=3))
+        self.assertEqual(serial, parallel)
+        self.assertEqual(serial[4], pokecat.generate_random_pokemon(rng=pokecat.rng.derive_rng("corpus", 4)))
+        out = StringIO()
+        corpus.write_corpus_jsonl(out, "pokesets", 5, seed="corpus", processes=2, shard_size=2)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[2]), json.loads(json.dumps(
+            pokecat.generate_random_pokeset(rng=pokecat.rng.derive_rng("corpus", 2)))))
+
+    def test_validate_pokeset(self):
+        doc = load_test_doc("_template")
+        doc["species"] = "Deoxys"
+        doc["form"] = "Attack"
+        doc["ability"] = "Thich Fat"
+        doc["moves"] = [["Surf (+3)", "Thunderbolt"], "Tackle"]
+        doc["combinations"] = [["Thunderbollt", "Tackle"]]
+        original = deepcopy(doc)
+        deoxys = deepcopy(pokecat.gen4data.get_pokemon("Deoxys"))
+        diagnostics = pokecat.Diagnostics()
+        self.assertIsNone(pokecat.validate_pokeset(doc, diagnostics=diagnostics))
+        expected = pokecat.Diagnostics()
+        pokecat.populate_pokeset(doc, diagnostics=expected)
+        self.assertEqual(diagnostics, expected)
+        self.assertEqual(len(diagnostics.with_code(pokecat.DiagnosticCode.AUTOCORRECTED)), 2)
+        # neither the input nor the data tables were modified
+        self.assertEqual(doc, original)
+        self.assertEqual(pokecat.gen4data.get_pokemon("Deoxys"), deoxys)
+        doc["species"] = "Arceus"
+        doc["form"] = 0
+        doc["item"] = ["Flame Plate", "Splash Plate"]
+        with self.assertRaisesRegex(ValueError, "Arceus currently must have a fixed item"):
+            pokecat.validate_pokeset(doc)
+
+    def test_populate_fields(self):
+        doc = load_test_doc("_template")
+        doc["ability"] = ["Pressure", "Thick Fat"]
+        doc["moves"] = [["Surf", "Thunderbolt"], "Tackle"]
+        full = pokecat.populate_pokeset(doc)
+        fields = ["species", "tags", "rarity", "biddable"]
+        projected = pokecat.populate_pokeset(doc, fields=fields)
+        self.assertEqual(projected, {field: full[field] for field in fields})
+        self.assertEqual(list(projected), fields)
+        self.assertEqual(pokecat.populate_pokeset(doc, fields=["curr_hp"]), {"curr_hp": full["curr_hp"]})
+        # moves aren't needed for the tags, so they aren't checked either
+        doc["moves"] = ["Tackle (+x)"]
+        pokecat.populate_pokeset(doc, fields=fields)
+        with self.assertRaises(ValueError):
+            pokecat.populate_pokeset(doc, fields=["moves"])
+        with self.assertRaisesRegex(ValueError, "Unknown fields to populate: foo"):
+            pokecat.populate_pokeset(doc, fields=["species", "foo"])
+
+    def test_file_formats(self):
+        from pokecat import fileio
+        self.assertEqual(fileio.detect_format("pool.jsonl.gz"), ("jsonl", "gzip"))
+        self.assertEqual(fileio.detect_format("pool.YML"), ("yaml", None))
+        self.assertEqual(fileio.detect_format("pool.txt", default="json"), ("json", None))
+        self.assertEqual(fileio.detect_format("pool.txt", "json.zst"), ("json", "zstd"))
+        with self.assertRaisesRegex(ValueError, "Unknown format"):
+            fileio.detect_format("pool.yaml", "xml")
+        pokesets = [pokecat.generate_random_pokeset(rng=seed) for seed in range(3)]
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("sets.yaml", "sets.json", "sets.jsonl", "sets.jsonl.gz", "sets.yaml.gz", "sets.txt"):
+                filename = os.path.join(directory, name)
+                fileio.dump_documents(iter(pokesets), filename)
+                self.assertEqual(fileio.load_documents(filename), pokesets, name)
+            # a YAML document containing a list is read as multiple documents
+            filename = os.path.join(directory, "list.yaml")
+            with open(filename, "w", encoding="utf-8") as f:
+                yaml.safe_dump([{"a": 1}, {"b": 2}], f)
+                f.write("---\n")
+            self.assertEqual(fileio.load_documents(filename), [{"a": 1}, {"b": 2}])
+
+    def test_normalized_pool(self):
+        from pokecat import fileio, normalized
+        doc = load_test_doc("_template")
+        doc["species"] = "Arceus"
+        doc["item"] = "Flame Plate"
+        doc["moves"] = [["Thunderbolt"], ["Surf"]]
+        pokesets = [pokecat.populate_pokeset(doc)]
+        doc["item"] = "Splash Plate"
+        doc["moves"] = ["Thunderbolt (+3)", "Surf"]
+        pokesets.append(pokecat.populate_pokeset(doc))
+        pool = normalized.normalize_pool(pokesets)
+        self.assertEqual(set(pool["dictionary"]["moves"]), {"85", "57"})
+        self.assertEqual(pool["dictionary"]["species"]["493"]["types"], ["Fire"])
+        self.assertEqual(pool["sets"][0]["species"], 493)
+        # the form-adjusted species only stores what differs from the dictionary entry
+        self.assertEqual(set(pool["sets"][1]["species"]), {"id", "types", "color"})
+        self.assertEqual(pool["sets"][1]["species"]["types"], ["Water"])
+        self.assertEqual(pool["sets"][1]["moves"][0], [{"id": 85, "pp": 24, "pp_ups": 3}])
+        self.assertEqual(pool["sets"][1]["moves"][1], [57])
+        self.assertEqual(normalized.expand_pool(pool), pokesets)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "pool.json")
+            fileio.dump_documents([pool], filename)
+            self.assertEqual(fileio.load_documents(filename), pokesets)
+        with self.assertRaisesRegex(ValueError, "Unsupported normalized pool version"):
+            normalized.expand_pool(dict(pool, version=2))
+
+    def test_metrics(self):
+        from pokecat import metrics
+        registry = metrics.Registry()
+        counter = registry.counter("test_things", "Things.", ("kind",))
+        counter.labels("a").inc()
+        counter.labels("a").inc(2)
+        histogram = registry.histogram("test_sizes", "Sizes.", (1, 5))
+        for value in (1, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(registry.prometheus().splitlines(), [
+            "# HELP test_sizes Sizes.",
+            "# TYPE test_sizes histogram",
+            'test_sizes_bucket{le="1"} 1',
+            'test_sizes_bucket{le="5"} 2',
+            'test_sizes_bucket{le="+Inf"} 3',
+            "test_sizes_sum 14",
+            "test_sizes_count 3",
+            "# HELP test_things Things.",
+            "# TYPE test_things counter",
+            'test_things_total{kind="a"} 3',
+        ])
+        snapshot = json.loads(json.dumps(registry.snapshot()))
+        self.assertEqual(snapshot["test_things"]["samples"], [{"labels": {"kind": "a"}, "value": 3}])
+        self.assertEqual(snapshot["test_sizes"]["samples"][0]["buckets"], [[1, 1], [5, 2], [None, 3]])
+        with self.assertRaisesRegex(ValueError, "already registered"):
+            registry.counter("test_things", "Again.")
+        registry.reset()
+        self.assertEqual(counter.labels("a").value, 0)
+
+        # the global registry counts what pokecat does
+        autocorrected = metrics.lookups.labels("move", "autocorrected").value
+        attempts = metrics.instantiate_attempts.labels().count
+        doc = load_test_doc("_template")
+        doc["moves"] = ["Thunderbollt"]
+        with self.assertWarns(UserWarning):
+            pokeset = pokecat.populate_pokeset(doc)
+        pokecat.instantiate_pokeset(pokeset)
+        self.assertEqual(metrics.lookups.labels("move", "autocorrected").value, autocorrected + 1)
+        self.assertEqual(metrics.instantiate_attempts.labels().count, attempts + 1)
+        self.assertIn("pokecat_populate_seconds_count", metrics.REGISTRY.prometheus())
+
+    def test_packing(self):
+        from pokecat import packing
+        team = [pokecat.generate_random_pokemon(rng=seed) for seed in range(6)]
+        team[0]["moves"] = team[0]["moves"][:1]
+        data = packing.pack_team(team)
+        self.assertEqual(len(data), 6 * packing.RECORD_SIZE)
+        self.assertEqual(packing.pack_pokemon(team[1]), data[packing.RECORD_SIZE:2*packing.RECORD_SIZE])
+        unpacked = packing.unpack_team(data)
+        for pokemon, record in zip(team, unpacked):
+            self.assertEqual(record["species"], pokemon["species"]["id"])
+            self.assertEqual(record["item"], pokemon["item"]["id"])
+            self.assertEqual(record["gender"], pokemon["gender"])
+            self.assertEqual(record["shiny"], pokemon["shiny"])
+            self.assertEqual(record["stats"], pokemon["stats"])
+            self.assertEqual(record["evs"], pokemon["evs"])
+            self.assertEqual([(m["id"], m["pp"], m["power"], m["category"]) for m in record["moves"]],
+                             [(m["id"], m["pp"], m["power"], m["category"]) for m in pokemon["moves"]])
+        self.assertEqual(len(unpacked[0]["moves"]), 1)
+        self.assertEqual(packing.unpack_pokemon(data, packing.RECORD_SIZE), unpacked[1])
+        with self.assertRaisesRegex(ValueError, "multiple of the record size"):
+            packing.unpack_team(data[:-1])
+        with self.assertRaisesRegex(ValueError, "between 1 and 4 moves"):
+            packing.pack_pokemon(dict(team[1], moves=[]))
+        with self.assertRaisesRegex(ValueError, "between 1 and 4 moves"):
+            packing.pack_pokemon(dict(team[1], moves=team[1]["moves"] * 5))
+        team[0]["level"] = 256
+        with self.assertRaisesRegex(ValueError, "doesn't fit into a packed record"):
+            packing.pack_team(team)
+        try:
+            import numpy
+        except ImportError:
+            return
+        array = numpy.frombuffer(data, dtype=packing.DTYPE)
+        self.assertEqual(list(array["species"]), [p["species"]["id"] for p in team])
+        self.assertEqual(int(array["moves"]["pp"][1][2]), team[1]["moves"][2]["pp"])
+
+    def test_memory_budgets(self):
+        from pokecat import memory
+        usages = [memory.measure_tables(), memory.measure_populate(50), memory.measure_instantiate(500, pool_size=50)]
+        for usage in usages:
+            self.assertGreater(usage.retained, 0, usage.name)
+            self.assertGreaterEqual(usage.peak, usage.retained, usage.name)
+            self.assertLessEqual(memory.per_object(usage), memory.BUDGETS[usage.name],
+                                 "%s exceeds its memory budget:\n%s" % (usage.name, memory.report(usages)))
+
+    def test_instance_buffer(self):
+        import time
+        from pokecat.instancebuffer import InstanceBuffer, buffer_gets
+        pokesets = {"a": pokecat.generate_random_pokeset(rng=1), "b": pokecat.generate_random_pokeset(rng=2)}
+        with InstanceBuffer(pokesets, depth=2, max_instances=3, rng=1) as buffer:
+            deadline = time.monotonic() + 10
+            while len(buffer) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(buffer), 3)
+            self.assertEqual(sorted([buffer.ready("a"), buffer.ready("b")]), [1, 2])
+            ready = buffer_gets.labels("ready").value
+            instance = buffer.get("a")
+            self.assertEqual(instance["species"], pokesets["a"]["species"])
+            self.assertNotIn("combinations", instance)
+            self.assertEqual(buffer_gets.labels("ready").value, ready + 1)
+            buffer.remove("b")
+            self.assertNotIn("b", buffer)
+            with self.assertRaises(KeyError):
+                buffer.get("b")
+        self.assertEqual(len(buffer), 0)
+        # without room for ready instances, they get instantiated on the spot
+        with InstanceBuffer(pokesets, max_instances=0) as buffer:
+            instantiated = buffer_gets.labels("instantiated").value
+            self.assertEqual(buffer.get("b")["species"], pokesets["b"]["species"])
+            self.assertEqual(buffer_gets.labels("instantiated").value, instantiated + 1)
+
+    def test_instance_buffer_refills_when_full(self):
+        import time
+        from pokecat.instancebuffer import InstanceBuffer
+        pokesets = {"a": pokecat.generate_random_pokeset(rng=1), "b": pokecat.generate_random_pokeset(rng=2)}
+
+        def wait_until(condition):
+            deadline = time.monotonic() + 10
+            while not condition() and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        with InstanceBuffer(pokesets, depth=3, max_instances=1, rng=1) as buffer:
+            wait_until(lambda: len(buffer) == 1)
+            self.assertEqual(len(buffer), 1)
+            for _ in range(3):
+                set_id = "a" if buffer.ready("a") else "b"
+                buffer.get(set_id)
+                wait_until(lambda: len(buffer) == 1)
+                self.assertEqual(len(buffer), 1)
+
+    def test_instance_buffer_failing_set(self):
+        import time
+        from pokecat.instancebuffer import InstanceBuffer
+        good = pokecat.generate_random_pokeset(rng=1)
+        with self.assertLogs("pokecat.instancebuffer", "ERROR"):
+            with InstanceBuffer(depth=2, rng=1) as buffer:
+                buffer.add("bad", {"nope": 1})
+                buffer.add("good", good)
+                deadline = time.monotonic() + 10
+                while buffer.ready("good") < 2 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(buffer.ready("good"), 2)
+                self.assertEqual(buffer.ready("bad"), 0)
+                with self.assertRaises(KeyError):
+                    buffer.get("bad")
+                self.assertEqual(buffer.get("good")["species"], good["species"])
+
+    def test_instance_buffer_rng_objects(self):
+        import random
+        from pokecat.instancebuffer import InstanceBuffer
+        rng = random.Random(5)
+        with InstanceBuffer(rng=rng) as buffer:
+            self.assertIsNot(buffer._rng, rng)
+            self.assertIsNot(buffer._rng, buffer._fallback_rng)
+        with InstanceBuffer(rng=random.Random(5)) as other:
+            self.assertEqual(other._fallback_rng.random(), buffer._fallback_rng.random())
+
+    def test_populate_and_instantiate(self):
+        from pokecat.rng import derive_rng
+        doc = load_test_doc("_template")
+        broken = dict(doc, species="BEST")
+        misspelled = dict(doc, moves=["Thunderbollt"])
+        results = list(pokecat.populate_and_instantiate([doc, broken, misspelled], amount=2, seed="fused"))
+        self.assertEqual([r.index for r in results], [0, 1, 2])
+        self.assertEqual(results[0].populated, pokecat.populate_pokeset(doc))
+        self.assertEqual(results[0].instances[1],
+                         pokecat.instantiate_pokeset(results[0].populated, rng=derive_rng("fused", 0, 1)))
+        self.assertIsInstance(results[1].error, ValueError)
+        self.assertEqual(results[1].instances, [])
+        self.assertEqual([d.code for d in results[2].diagnostics], [pokecat.DiagnosticCode.AUTOCORRECTED])
+        self.assertEqual(len(results[2].instances), 2)
+        self.assertNotIn("combinations", results[2].instances[0])
+
     def test_empty_otions(self):
         fields = ["ability", "item", "ball", "gender"]
         for field in fields:
@@ -13,6 +13,7 @@ setup(
     package_dir={"pokecat": "pokecat"},
     package_data={"pokecat": ["gen1data/*.json", "gen4data/*.json", "globaldata/*.json", "pbrdata/*.json", "VERSION"]},
     install_requires=['pyyaml', 'python-Levenshtein-wheels', 'docopt', 'unidecode'],
+    extras_require={'analysis': ['numpy'], 'zstd': ['zstandard']},
 
     author="Felk",
     description="Tool used by TwitchPlaysPokemon for handling and processing Pokémon set data, metasets, and some global utilities.",